@@ -1,10 +1,14 @@
+import hashlib
 import pandas as pd
 import numpy as np
-import sqlite3
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 import matplotlib.pyplot as plt
 import streamlit as st
-from database import create_tables, register_user, login_user
+from database import (create_tables, register_user, login_user,
+                      get_forecast, store_forecast, link_user_forecast)
+
+# Bump whenever the model specification below changes so stale forecasts are not reused
+MODEL_VERSION = "sarimax-(1,1,1)x(1,1,0,12)-5y"
 
 # Ensure tables exist
 create_tables()
@@ -54,20 +58,18 @@ if st.session_state.user_id:
     selected_commodity = st.selectbox("Choose a Commodity", commodities)
 
     if st.button("Submit"):
-        conn = sqlite3.connect("crop_predict.db")
-        cursor = conn.cursor()
+        data = df[selected_commodity]
+        # Forecasts are shared across users and keyed by the exact series they were fit on
+        data_version = hashlib.sha1(data.to_numpy().tobytes()).hexdigest()[:16]
 
         # Check if forecast exists
-        cursor.execute("SELECT year, forecast_price FROM predictions WHERE user_id=? AND commodity=?", 
-                       (st.session_state.user_id, selected_commodity))
-        existing_forecast = cursor.fetchall()
+        existing_forecast = get_forecast(selected_commodity, MODEL_VERSION, data_version)
 
         if existing_forecast:
             st.write(f"### {selected_commodity} Price Forecast (2025-2029) - Stored Data")
             forecast_df = pd.DataFrame(existing_forecast, columns=['Year', f'{selected_commodity}_Price_Forecast'])
         else:
             # Generate new forecast
-            data = df[selected_commodity]
             model = SARIMAX(data, order=(1, 1, 1), seasonal_order=(1, 1, 0, 12))
             sarimax_model = model.fit(disp=False)
             forecast = sarimax_model.get_forecast(steps=5)
@@ -76,13 +78,11 @@ if st.session_state.user_id:
             forecast_years = pd.date_range(start='2025', periods=5, freq='YE')
             forecast_df = pd.DataFrame({'Year': forecast_years, f'{selected_commodity}_Price_Forecast': forecasted_values})
 
-            # Store in SQL
-            for year, price in zip(forecast_years.year, forecasted_values):
-                cursor.execute("INSERT INTO predictions (user_id, commodity, year, forecast_price) VALUES (?, ?, ?, ?)", 
-                               (st.session_state.user_id, selected_commodity, year, price))
-            conn.commit()
+            # Store once in SQL for every user
+            store_forecast(selected_commodity, MODEL_VERSION, data_version,
+                           zip(forecast_years.year, forecasted_values))
 
-        conn.close()
+        link_user_forecast(st.session_state.user_id, selected_commodity, MODEL_VERSION, data_version)
         st.write(forecast_df)
         
         # Plot chart
@@ -1,21 +1,34 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory, session
+from flask import Flask, request, jsonify, render_template, send_from_directory, session, Response, stream_with_context, g
+import json
+import mimetypes
 import sqlite3
 import pandas as pd
-from statsmodels.tsa.statespace.sarimax import SARIMAX
 from flask_cors import CORS
+from werkzeug.exceptions import NotFound
 import os
 import numpy as np
-from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 import random
-from datetime import datetime, timedelta
-from database import verify_database, store_otp, verify_otp, DB_FILE
+import time
+from datetime import datetime
+from database import verify_database, update_password_hash, list_model_orders, get_model_order, get_series_version, DB_FILE
+import otp_store
+from downsample import downsample_points
+from forecasting import (get_commodity_category, build_model, check_backend, fit_model, series_version,
+                         MODEL_BACKEND, MODEL_BACKENDS)
+import assets
+import model_store
+import profiling
+import shared_cache
+from simulation import check_simulation, simulate_paths, band_offsets, QUANTILE_LABELS, DEFAULT_PATHS, MAX_PATHS
+from hashing import hash_password, check_password, needs_rehash, pool_stats, HashPoolFull
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import requests
 
-app = Flask(__name__, static_folder="static", template_folder="templates")
+# Static files go through static_files below (Flask's built-in static route would shadow it)
+app = Flask(__name__, static_folder=None, template_folder="templates")
 CORS(app, supports_credentials=True)  # Allow frontend access with credentials
 app.secret_key = 'your-secret-key-here'  # Change this to a secure secret key
 
@@ -30,6 +43,32 @@ TWILIO_ACCOUNT_SID = "your-twilio-sid"
 TWILIO_AUTH_TOKEN = "your-twilio-token"
 TWILIO_PHONE_NUMBER = "your-twilio-phone"
 
+# Periodically clear out expired verification codes
+otp_store.start_sweeper()
+
+# Create missing tables and migrate an older database before serving any request
+verify_database()
+
+# Load saved model parameters so the first forecast after a restart skips fitting
+model_store.load_artifacts()
+
+# Forecasts and histories are cached in a SQLite file shared by all worker processes
+shared_cache.init_cache()
+
+# Fingerprinted static assets from `python assets.py`; without a build the originals are served
+assets.load_manifest()
+
+@app.context_processor
+def asset_helpers():
+    return {"asset_url": assets.asset_url, "asset_srcset": assets.asset_srcset}
+
+# "category" uses the fixed per-category SARIMAX orders, "auto" the orders found by
+# `python order_selection.py` (falling back to the category orders until it has run)
+ORDER_SELECTION = os.environ.get("ORDER_SELECTION", "category")
+
+# Usernames allowed to use admin endpoints and request profiling (comma-separated)
+ADMIN_USERS = {name.strip() for name in os.environ.get("ADMIN_USERS", "").split(",") if name.strip()}
+
 def send_email_otp(contact, otp):
     """Send OTP via email."""
     try:
@@ -92,6 +131,33 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({"error": "Authentication required"}), 401
+        if session.get('username') not in ADMIN_USERS:
+            return jsonify({"error": "Admin access required"}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def profiled(f):
+    """Runs the view under cProfile and tracemalloc when an admin sends X-Profile: 1 or ?profile=1."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        requested = request.headers.get("X-Profile") == "1" or request.args.get("profile") == "1"
+        if not requested or session.get('username') not in ADMIN_USERS:
+            return f(*args, **kwargs)
+        details = {"path": request.path, "args": request.args.to_dict(), "user": session['username']}
+        # Profile the real work, not a shared cache hit
+        g.skip_shared_cache = True
+        response, capture_id = profiling.profile_call(
+            request.endpoint, lambda: app.make_response(f(*args, **kwargs)), details)
+        if capture_id:
+            response.headers["X-Profile-Capture"] = capture_id
+        return response
+    return decorated_function
+
 # User Authentication Endpoints
 @app.route("/register", methods=["POST"])
 def register():
@@ -136,8 +202,8 @@ def register():
                 app.logger.error(f"Contact already registered: {contact}")
                 return jsonify({"error": "Contact already registered"}), 409
 
-            # Hash password and store user
-            hashed_password = generate_password_hash(password)
+            # Hash password (on the bounded hashing pool) and store user
+            hashed_password = hash_password(password)
             cursor.execute(
                 "INSERT INTO users (username, password, contact) VALUES (?, ?, ?)",
                 (username, hashed_password, contact)
@@ -147,10 +213,10 @@ def register():
 
             # Generate and send OTP
             otp = ''.join(random.choices('0123456789', k=6))
-            expiry = datetime.now() + timedelta(minutes=5)
+            expiry = int(time.time()) + otp_store.OTP_TTL_SECONDS
             
-            # Store OTP in database
-            if not store_otp(contact, otp, expiry.strftime('%Y-%m-%d %H:%M:%S')):
+            # Store OTP in the OTP store
+            if not otp_store.store_otp(contact, otp, expiry):
                 app.logger.error(f"Failed to store OTP for {contact}")
                 return jsonify({"error": "Failed to generate verification code"}), 500
             
@@ -161,6 +227,9 @@ def register():
 
             return jsonify({"message": "Registration successful. Please check your email/phone for verification code."}), 201
 
+        except HashPoolFull:
+            app.logger.warning("Password hashing pool full during registration")
+            return jsonify({"error": "Server busy, please try again"}), 503
         except sqlite3.Error as e:
             app.logger.error(f"Database error during registration: {str(e)}")
             return jsonify({"error": f"Database error: {str(e)}"}), 500
@@ -181,7 +250,7 @@ def verify_otp():
         if not contact or not otp:
             return jsonify({"error": "Contact and OTP are required"}), 400
 
-        if verify_otp(contact, otp):
+        if otp_store.verify_otp(contact, otp):
             return jsonify({"message": "Verification successful"}), 200
         else:
             return jsonify({"error": "Invalid or expired OTP"}), 400
@@ -201,10 +270,10 @@ def resend_otp():
 
         # Generate new OTP
         otp = ''.join(random.choices('0123456789', k=6))
-        expiry = datetime.now() + timedelta(minutes=5)
+        expiry = int(time.time()) + otp_store.OTP_TTL_SECONDS
         
-        # Store new OTP in database
-        store_otp(contact, otp, expiry.strftime('%Y-%m-%d %H:%M:%S'))
+        # Store new OTP in the OTP store
+        otp_store.store_otp(contact, otp, expiry)
         
         # TODO: Implement actual OTP sending via email/SMS
         print(f"New OTP for {contact}: {otp}")  # For development only
@@ -233,7 +302,10 @@ def login():
         user = cursor.fetchone()
         conn.close()
 
-        if user and check_password_hash(user[1], password):
+        if user and check_password(user[1], password):
+            # Transparently upgrade hashes made with old cost parameters
+            if needs_rehash(user[1]):
+                update_password_hash(user[0], hash_password(password))
             session['user_id'] = user[0]
             session['username'] = username
             return jsonify({
@@ -243,6 +315,9 @@ def login():
         else:
             return jsonify({"error": "Invalid credentials"}), 401
 
+    except HashPoolFull:
+        app.logger.warning("Password hashing pool full during login")
+        return jsonify({"error": "Server busy, please try again"}), 503
     except Exception as e:
         app.logger.error(f"Login error: {str(e)}")
         return jsonify({"error": "Login failed"}), 500
@@ -261,107 +336,282 @@ def check_auth():
         }), 200
     return jsonify({"authenticated": False}), 401
 
+@app.route("/auth_stats", methods=["GET"])
+@admin_required
+def auth_stats():
+    return jsonify(pool_stats()), 200
+
+@app.route("/model_orders", methods=["GET"])
+@login_required
+def model_orders():
+    return jsonify(list_model_orders()), 200
+
+@app.route("/admin/profiles", methods=["GET"])
+@admin_required
+def admin_profiles():
+    limit = request.args.get("limit", 20, type=int)
+    return jsonify(profiling.list_captures(limit)), 200
+
+@app.route("/admin/profiles/<capture_id>", methods=["GET"])
+@admin_required
+def admin_profile(capture_id):
+    capture = profiling.get_capture(capture_id)
+    if capture is None:
+        return jsonify({"error": "Capture not found"}), 404
+    # format=prof downloads the raw cProfile stats for pstats/snakeviz
+    if request.args.get("format") == "prof":
+        return send_from_directory(os.path.abspath(profiling.PROFILE_DIR), f"{capture_id}.prof", as_attachment=True)
+    return jsonify(capture), 200
+
+@app.route("/admin/cache", methods=["GET"])
+@admin_required
+def admin_cache():
+    return jsonify(shared_cache.stats()), 200
+
 # ✅ Serve index.html (Frontend)
 @app.route("/")
 def home():
     return render_template("index.html")
 
-# ✅ Serve Static Files (script.js, styles.css)
+# ✅ Serve Static Files (script.js, styles.css, fingerprinted build output)
 @app.route("/static/<path:filename>")
 def static_files(filename):
     try:
-        return send_from_directory("static", filename)
+        # Send a precompressed copy when the client accepts it; the type is the original's
+        served, encoding = assets.precompressed(filename, request.headers.get("Accept-Encoding", ""))
+        response = send_from_directory(assets.STATIC_DIR, served, mimetype=mimetypes.guess_type(filename)[0])
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if served != filename or os.path.exists(os.path.join(assets.STATIC_DIR, filename + ".gz")):
+            response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = assets.cache_control(filename)
+        return response
+    except NotFound:
+        return "Not found", 404
     except Exception as e:
         app.logger.error(f"Error serving static file {filename}: {str(e)}")
         return f"Error: {str(e)}", 500
 
+def read_rollup_series(conn, commodity, level, location=""):
+    """Reads a commodity's monthly or yearly rollup as a DataFrame with a price column."""
+    query = """
+        SELECT period AS date, mean_price AS price
+        FROM price_rollups
+        WHERE location = ? AND LOWER(commodity) = LOWER(?) AND level = ?
+        ORDER BY period
+    """
+    return pd.read_sql_query(query, conn, params=(location, commodity, level),
+                             parse_dates={"date": "%Y-%m-%d"}, index_col="date")
+
+# Upper bound on rows per page of /get_prices
+MAX_PAGE_SIZE = 5000
+
+def build_price_query(commodity, date_from=None, date_to=None, after=None, limit=None, rollup=None,
+                      location=""):
+    """Builds the SQL and params for a commodity's price history with filters pushed down.
+
+    With rollup set to 'monthly' or 'yearly' the pre-aggregated means are read instead
+    of the raw rows. location '' is the national series.
+    """
+    # Use case-insensitive comparison (served by the (location, LOWER(commodity)) indexes)
+    if rollup:
+        query = ("SELECT id, date, price FROM (SELECT rowid AS id, period AS date, mean_price AS price "
+                 "FROM price_rollups WHERE location = ? AND LOWER(commodity) = LOWER(?) AND level = ?) WHERE 1 = 1")
+        params = [location, commodity, rollup]
+    else:
+        query = "SELECT id, date, price FROM commodity_prices WHERE location = ? AND LOWER(commodity) = LOWER(?)"
+        params = [location, commodity]
+    if date_from:
+        query += " AND date >= ?"
+        params.append(date_from)
+    if date_to:
+        query += " AND date <= ?"
+        params.append(date_to)
+    if after:
+        # Keyset pagination: continue strictly after the (date, id) of the previous page
+        query += " AND (date > ? OR (date = ? AND id > ?))"
+        params.extend([after[0], after[0], after[1]])
+    query += " ORDER BY date, id"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+def parse_price_cursor(value):
+    """Parses a '<date>~<id>' pagination cursor."""
+    cursor_date, sep, row_id = value.rpartition("~")
+    try:
+        return parse_date_param(cursor_date, "cursor"), int(row_id)
+    except ValueError:
+        raise ValueError("Invalid cursor") from None
+
+def parse_date_param(value, name):
+    """Parses an optional YYYY-MM-DD date parameter; prices are stored with ISO dates."""
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"{name} must be a date in YYYY-MM-DD format") from None
+
+def parse_max_points(value):
+    """Parses the optional max_points chart parameter (LTTB needs at least 3 points)."""
+    if value is None:
+        return None
+    if not value.isdigit() or int(value) < 3:
+        raise ValueError("max_points must be an integer of at least 3")
+    return int(value)
+
 # ✅ Fetch Historical Prices
 @app.route("/get_prices", methods=["GET"])
 @login_required
+@profiled
 def get_prices():
     commodity = request.args.get("commodity")
     if not commodity:
         return jsonify({"error": "Commodity is required"}), 400
 
+    try:
+        limit = request.args.get("limit")
+        if limit is not None:
+            if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+                raise ValueError(f"limit must be an integer between 1 and {MAX_PAGE_SIZE}")
+            limit = int(limit)
+        after = parse_price_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+        max_points = parse_max_points(request.args.get("max_points"))
+        date_from = parse_date_param(request.args.get("from"), "from")
+        date_to = parse_date_param(request.args.get("to"), "to")
+        rollup = request.args.get("rollup")
+        if rollup not in (None, "monthly", "yearly"):
+            raise ValueError("rollup must be 'monthly' or 'yearly'")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    location = request.args.get("location", "")
+    streaming = request.args.get("format") == "ndjson"
+
+    cache_key = shared_cache.make_key(
+        "get_prices", get_series_version(commodity, location), commodity=commodity.lower(), location=location,
+        date_from=date_from, date_to=date_to, after=after, limit=limit, rollup=rollup, max_points=max_points)
+    cached = None if streaming or g.get("skip_shared_cache") else shared_cache.get(cache_key)
+    if cached is not None:
+        response = jsonify(cached["prices"])
+        if cached["next_cursor"]:
+            response.headers["X-Next-Cursor"] = cached["next_cursor"]
+        return response
+
+    query, params = build_price_query(
+        commodity,
+        date_from=date_from,
+        date_to=date_to,
+        after=after,
+        limit=limit,
+        rollup=rollup,
+        location=location
+    )
+
     conn = sqlite3.connect(DB_FILE)
     cursor = conn.cursor()
-    
-    # Use case-insensitive comparison
-    cursor.execute("""
-        SELECT date, price 
-        FROM commodity_prices 
-        WHERE LOWER(commodity) = LOWER(?) 
-        ORDER BY date
-    """, (commodity,))
-    
+    cursor.execute(query, params)
+
+    if streaming:
+        first = cursor.fetchone()
+        if first is None:
+            conn.close()
+            return jsonify({"error": f"No data available for {commodity}"}), 404
+
+        def generate():
+            # Yield rows straight from the cursor so memory stays bounded
+            try:
+                row = first
+                while row is not None:
+                    yield json.dumps({"date": row[1], "price": row[2]}) + "\n"
+                    row = cursor.fetchone()
+            finally:
+                conn.close()
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
     data = cursor.fetchall()
     conn.close()
 
     if not data:
         return jsonify({"error": f"No data available for {commodity}"}), 404
 
-    prices = [{"date": row[0], "price": row[1]} for row in data]
-    return jsonify(prices)
+    prices = downsample_points([{"date": row[1], "price": row[2]} for row in data], max_points)
+    next_cursor = f"{data[-1][1]}~{data[-1][0]}" if limit and len(data) == limit else None
+    shared_cache.put(cache_key, {"prices": prices, "next_cursor": next_cursor})
+
+    response = jsonify(prices)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 # ✅ Predict Future Prices Using ML Model
 @app.route("/predict_prices", methods=["GET"])
 @login_required
+@profiled
 def predict_prices():
     try:
         commodity = request.args.get("commodity")
         if not commodity:
             return jsonify({"error": "Commodity is required"}), 400
 
-        # Fetch historical price data with case-insensitive comparison
+        try:
+            max_points = parse_max_points(request.args.get("max_points"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        location = request.args.get("location", "")
+        order_selection = request.args.get("orders", ORDER_SELECTION)
+        if order_selection not in ("category", "auto"):
+            return jsonify({"error": "orders must be 'category' or 'auto'"}), 400
+        backend = request.args.get("backend", MODEL_BACKEND)
+        if backend not in MODEL_BACKENDS:
+            return jsonify({"error": f"backend must be one of {', '.join(MODEL_BACKENDS)}"}), 400
+
+        # uncertainty=mc adds Monte Carlo quantile bands from simulated forecast paths
+        uncertainty = request.args.get("uncertainty")
+        if uncertainty not in (None, "mc"):
+            return jsonify({"error": "uncertainty must be 'mc'"}), 400
+        n_paths = None
+        if uncertainty == "mc":
+            n_paths = request.args.get("paths", str(DEFAULT_PATHS))
+            if not n_paths.isdigit() or not 100 <= int(n_paths) <= MAX_PATHS:
+                return jsonify({"error": f"paths must be an integer between 100 and {MAX_PATHS}"}), 400
+            n_paths = int(n_paths)
+
+        # Serve a forecast another worker already computed for the same data version and,
+        # with orders=auto, the same cached order search result (a re-search changes the model)
+        model_order = get_model_order(commodity, location) if order_selection == "auto" else None
+        cache_key = shared_cache.make_key(
+            "predict_prices", get_series_version(commodity, location), commodity=commodity.lower(),
+            location=location, orders=order_selection, model_order=model_order, backend=backend,
+            uncertainty=uncertainty, paths=n_paths, max_points=max_points)
+        cached = None if g.get("skip_shared_cache") else shared_cache.get(cache_key)
+        if cached is not None:
+            return jsonify(cached)
+
+        # Read the pre-aggregated monthly and yearly series maintained at ingest time
         conn = sqlite3.connect(DB_FILE)
-        query = """
-            SELECT date, price 
-            FROM commodity_prices 
-            WHERE LOWER(commodity) = LOWER(?) 
-            ORDER BY date
-        """
-        df = pd.read_sql_query(query, conn, params=(commodity,))
+        df = read_rollup_series(conn, commodity, "monthly", location)
+        yearly_df = read_rollup_series(conn, commodity, "yearly", location)
         conn.close()
 
-        if df.empty:
+        if df.empty or yearly_df.empty:
             return jsonify({"error": f"No data available for {commodity}"}), 404
 
-        # Convert date column to datetime index and handle duplicates
-        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
-        df = df.drop_duplicates(subset=["date"], keep="first")
-        df.set_index("date", inplace=True)
-        df = df.sort_index()
-        
-        # Ensure we have numeric prices and handle missing values
-        df["price"] = pd.to_numeric(df["price"], errors="coerce")
-        df = df.dropna()
-
         if len(df) < 12:  # Need at least 12 months of data
             return jsonify({"error": f"Insufficient historical data for {commodity}"}), 400
 
-        # Resample to yearly frequency and fill missing values
-        yearly_df = df.resample('Y').mean()
+        # Fill any missing years
+        yearly_df = yearly_df.asfreq('Y')
         yearly_df = yearly_df.fillna(method='ffill').fillna(method='bfill')
 
         # Calculate historical trend
         historical_prices = yearly_df["price"].values
         historical_years = len(historical_prices)
         
-        # Special handling for different commodity categories
-        def get_commodity_category(commodity):
-            commodity = commodity.lower()
-            categories = {
-                'vegetables': ['onion', 'potato', 'tomato'],
-                'pulses': ['gram dal', 'tur/arhar dal', 'urad dal', 'moong dal', 'masoor dal'],
-                'oils': ['groundnut oil', 'mustard oil', 'vanaspati', 'soya oil', 'sunflower oil', 'palm oil'],
-                'cereals': ['rice', 'wheat'],
-                'others': ['sugar', 'gur', 'tea loose', 'milk', 'salt pack (iodised)']
-            }
-            for category, items in categories.items():
-                if commodity in items:
-                    return category
-            return 'others'
-
         # Get category-specific parameters
         category = get_commodity_category(commodity)
         
@@ -435,28 +685,31 @@ def predict_prices():
         else:
             growth_rate = params['min_growth']
 
-        # Train SARIMAX Model with category-specific parameters
-        if category in ['vegetables', 'pulses']:
-            model = SARIMAX(
-                yearly_df["price"],
-                order=(2, 1, 2),
-                seasonal_order=(2, 1, 1, 12),
-                enforce_stationarity=False
-            )
-        else:
-            model = SARIMAX(
-                yearly_df["price"],
-                order=(1, 1, 1),
-                seasonal_order=(1, 1, 0, 12),
-                enforce_stationarity=False
-            )
-        
-        sarimax_model = model.fit(disp=False)
+        # Train SARIMAX Model with category-specific (or automatically selected) orders
+        # Order searches run offline (python order_selection.py); until one has covered this
+        # version of the series, orders=auto uses the category orders
+        orders = None
+        if order_selection == "auto":
+            orders = get_model_order(commodity, location, series_version(yearly_df["price"].values))
+        model = build_model(yearly_df["price"], category, orders)
+        try:
+            check_backend(model, backend)
+            if uncertainty == "mc":
+                check_simulation(model)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        sarimax_model = fit_model(model, commodity, location, backend)
 
         # Make predictions for the next 5 years
         forecast = sarimax_model.get_forecast(steps=5)
         forecasted_values = forecast.predicted_mean
-        confidence_intervals = forecast.conf_int()
+
+        # Simulate forecast paths and express each quantile as an offset from the model mean,
+        # so the bands can be applied to the adjusted yearly and monthly prices below
+        offsets = None
+        if uncertainty == "mc":
+            offsets = band_offsets(simulate_paths(sarimax_model, 5, n_paths), forecasted_values)
 
         # Get the last actual price and historical volatility
         last_actual_price = yearly_df["price"].iloc[-1]
@@ -507,6 +760,11 @@ def predict_prices():
                 "price": round(safe_price, 2)
             })
 
+        if offsets is not None:
+            for i, pred in enumerate(yearly_data):
+                pred["bands"] = {label: round(pred["price"] + float(offsets[q, i]), 2)
+                                 for q, label in enumerate(QUANTILE_LABELS)}
+
         # Generate monthly data by interpolating between yearly predictions
         monthly_dates = pd.date_range(
             start=future_dates[0],
@@ -560,10 +818,21 @@ def predict_prices():
                 "price": round(safe_price, 2)
             })
 
-        return jsonify({
-            "yearly_predictions": yearly_data,
-            "monthly_predictions": monthly_data
-        })
+        if offsets is not None:
+            # Interpolate the yearly offsets (zero at the last actual price) onto the monthly dates
+            anchor_days = yearly_series.index.values.astype("datetime64[D]").astype(float)
+            month_days = monthly_dates.values.astype("datetime64[D]").astype(float)
+            for q, label in enumerate(QUANTILE_LABELS):
+                monthly_offsets = np.interp(month_days, anchor_days, np.concatenate([[0.0], offsets[q]]))
+                for pred, offset in zip(monthly_data, monthly_offsets):
+                    pred.setdefault("bands", {})[label] = round(pred["price"] + float(offset), 2)
+
+        result = {
+            "yearly_predictions": downsample_points(yearly_data, max_points),
+            "monthly_predictions": downsample_points(monthly_data, max_points)
+        }
+        shared_cache.put(cache_key, result)
+        return jsonify(result)
 
     except Exception as e:
         app.logger.error(f"Error in predict_prices: {str(e)}")
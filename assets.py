@@ -0,0 +1,196 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from io import BytesIO
+
+from werkzeug.security import safe_join
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is only needed to build the resized WebP image variants
+    Image = None
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip variants are always built
+    brotli = None
+
+# Resolved from this file like Flask's app.root_path, so builds and lookups work from any CWD
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+# Build output, relative to STATIC_DIR; every file in it has a content hash in its name
+DIST_DIR = "dist"
+MANIFEST_PATH = os.path.join(STATIC_DIR, DIST_DIR, "manifest.json")
+
+# "built" serves the fingerprinted files from the manifest when it exists, "source" the originals
+ASSET_MODE = os.environ.get("ASSET_MODE", "built")
+
+TEXT_EXTENSIONS = {".js", ".css", ".svg", ".json", ".txt", ".html"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+# The hero slideshow is 500px wide; 1000px covers 2x displays
+IMAGE_WIDTHS = (500, 1000)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+_manifest = {}  # source path (relative to STATIC_DIR) -> {"path": ..., "webp": [[width, path], ...]}
+
+def _fingerprint(data):
+    return hashlib.sha1(data).hexdigest()[:12]
+
+def _write_fingerprinted(rel_path, data):
+    """Writes data under DIST_DIR as name.<hash>.ext and returns its path relative to STATIC_DIR."""
+    stem, ext = os.path.splitext(rel_path)
+    out_rel = f"{DIST_DIR}/{stem}.{_fingerprint(data)}{ext}"
+    out_path = os.path.join(STATIC_DIR, out_rel)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "wb") as f:
+        f.write(data)
+    return out_rel
+
+def _precompress(rel_path, data):
+    """Writes .gz (and .br when brotli is installed) next to a built text asset if smaller."""
+    path = os.path.join(STATIC_DIR, rel_path)
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+            written.append(rel_path + suffix)
+    return written
+
+def _encode_image(image, width, fmt, quality):
+    """Returns the image resized to at most width pixels wide, encoded as fmt."""
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, fmt, quality=quality)
+    return buffer.getvalue()
+
+def _build_image(rel_path, data):
+    """Builds the manifest entry for an image: WebP variants plus a resized JPEG fallback."""
+    if Image is None:
+        return {"path": _write_fingerprinted(rel_path, data), "webp": []}
+    image = Image.open(BytesIO(data)).convert("RGB")
+    stem = os.path.splitext(rel_path)[0]
+    webp = [
+        [width, _write_fingerprinted(f"{stem}-{width}.webp", _encode_image(image, width, "WEBP", WEBP_QUALITY))]
+        for width in IMAGE_WIDTHS
+    ]
+    fallback = _encode_image(image, IMAGE_WIDTHS[-1], "JPEG", JPEG_QUALITY)
+    return {"path": _write_fingerprinted(f"{stem}-{IMAGE_WIDTHS[-1]}.jpg", fallback), "webp": webp}
+
+def build_assets(clean=False):
+    """Fingerprints, precompresses and resizes everything in STATIC_DIR into DIST_DIR.
+
+    The manifest is replaced atomically once every file it references exists,
+    so a running server never sees a half-built set. Files from earlier builds
+    are kept (pages already cached by browsers still reference them) unless
+    clean is set. Returns the new manifest.
+    """
+    if Image is None:
+        print("Pillow is not installed; images are fingerprinted but no WebP variants are built")
+
+    manifest = {}
+    outputs = set()
+    for root, dirs, files in os.walk(STATIC_DIR):
+        if os.path.abspath(root) == os.path.abspath(STATIC_DIR):
+            dirs[:] = [d for d in dirs if d != DIST_DIR]
+        for name in sorted(files):
+            rel_path = os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, "/")
+            ext = os.path.splitext(name)[1].lower()
+            with open(os.path.join(root, name), "rb") as f:
+                data = f.read()
+
+            extra = []
+            if ext in IMAGE_EXTENSIONS:
+                entry = _build_image(rel_path, data)
+            else:
+                entry = {"path": _write_fingerprinted(rel_path, data), "webp": []}
+                if ext in TEXT_EXTENSIONS:
+                    extra = _precompress(entry["path"], data)
+            manifest[rel_path] = entry
+            outputs.update([entry["path"], *extra, *(path for _, path in entry["webp"])])
+
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(MANIFEST_PATH), suffix=".json.tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        # mkstemp creates the file owner-only; the web server may run as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, MANIFEST_PATH)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+    if clean:
+        dist_root = os.path.join(STATIC_DIR, DIST_DIR)
+        for root, _, files in os.walk(dist_root):
+            for name in files:
+                rel_path = os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, "/")
+                if rel_path not in outputs and os.path.join(root, name) != MANIFEST_PATH:
+                    os.unlink(os.path.join(root, name))
+    return manifest
+
+def load_manifest():
+    """Loads the build manifest, if any, for asset_url (call once at startup)."""
+    _manifest.clear()
+    if ASSET_MODE != "built" or not os.path.exists(MANIFEST_PATH):
+        return 0
+    with open(MANIFEST_PATH) as f:
+        _manifest.update(json.load(f))
+    return len(_manifest)
+
+def asset_url(path):
+    """Returns the URL of a static asset, fingerprinted if it has been built."""
+    entry = _manifest.get(path)
+    return f"/static/{entry['path'] if entry else path}"
+
+def asset_srcset(path):
+    """Returns a srcset of an image's WebP variants, or '' if none were built."""
+    entry = _manifest.get(path)
+    if not entry:
+        return ""
+    return ", ".join(f"/static/{variant} {width}w" for width, variant in entry["webp"])
+
+def cache_control(filename):
+    """Fingerprinted build output never changes, so it can be cached forever."""
+    if filename.startswith(f"{DIST_DIR}/") and filename != f"{DIST_DIR}/manifest.json":
+        return IMMUTABLE_CACHE_CONTROL
+    return REVALIDATE_CACHE_CONTROL
+
+def precompressed(filename, accept_encoding):
+    """Returns (filename to send, Content-Encoding or None) honouring the client's Accept-Encoding."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        params = params.replace(" ", "")
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+
+    for suffix, coding in ((".br", "br"), (".gz", "gzip")):
+        if coding in accepted:
+            path = safe_join(STATIC_DIR, filename + suffix)
+            if path and os.path.isfile(path):
+                return filename + suffix, coding
+    return filename, None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed static assets.")
+    parser.add_argument("--clean", action="store_true", help="Delete build output from earlier builds")
+    args = parser.parse_args()
+
+    built = build_assets(clean=args.clean)
+    print(f"✅ Built {len(built)} assets into {os.path.join(STATIC_DIR, DIST_DIR)}")
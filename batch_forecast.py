@@ -0,0 +1,143 @@
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from database import DB_FILE, store_forecasts
+import batched_kalman
+from forecasting import (MODEL_BACKEND, MODEL_BACKENDS, build_model, fit_model, fit_models,
+                         get_commodity_category, get_model_orders, series_version)
+
+BATCH_MODEL_VERSION = "batch-sarimax-yearly-5y"
+FORECAST_YEARS = 5
+CHUNK_SIZE = 64
+
+def load_region_series(region=None):
+    """Loads every (location, commodity) yearly rollup in a region as one wide DataFrame.
+
+    Locations are named 'Region/Market'; a region matches itself and every location
+    under it, and None loads all locations. Columns are (location, commodity) pairs,
+    the index is year-end dates, and gaps between a series' first and last report are
+    forward filled. Years before a market's first report or after its last stay NaN.
+    """
+    query = "SELECT location, commodity, period, mean_price FROM price_rollups WHERE level = 'yearly'"
+    params = []
+    if region is not None:
+        # Range scan on the location-leading index instead of a LIKE
+        query += " AND (location = ? OR (location >= ? AND location < ?))"
+        params = [region, region + "/", region + "0"]
+
+    conn = sqlite3.connect(DB_FILE)
+    df = pd.read_sql_query(query, conn, params=params, parse_dates={"period": "%Y-%m-%d"})
+    conn.close()
+
+    if df.empty:
+        return pd.DataFrame()
+    wide = df.pivot_table(index="period", columns=["location", "commodity"], values="mean_price")
+    wide = wide.asfreq('Y')
+    return wide.ffill().where(wide.bfill().notna())
+
+def trim_series(series):
+    """Trims a series to its own reporting span; slicing keeps the yearly freq."""
+    return series.loc[series.first_valid_index():series.last_valid_index()]
+
+def check_batched_backend(wide):
+    """Raises ValueError if any series in the region is too short for the batched backend."""
+    unsupported = []
+    for location, commodity in wide.columns:
+        nobs = len(trim_series(wide[(location, commodity)]))
+        order, seasonal_order = get_model_orders(get_commodity_category(commodity))
+        if nobs >= 2 and not batched_kalman.supports(nobs, order, seasonal_order):
+            unsupported.append(f"{commodity} at {location or 'national'} "
+                               f"({nobs} of {batched_kalman.min_nobs(order, seasonal_order)} years needed "
+                               f"for SARIMAX{order}x{seasonal_order})")
+    if unsupported:
+        raise ValueError(f"backend 'batched' cannot fit {len(unsupported)} of {len(wide.columns)} series, "
+                         f"e.g. {unsupported[0]}; use --backend statsmodels")
+
+def forecast_chunk(keys, values, index, backend=MODEL_BACKEND):
+    """Fits and forecasts every series (column) of one chunk; runs in a worker process."""
+    series_list = []
+    for (location, commodity), column in zip(keys, values.T):
+        series = trim_series(pd.Series(column, index=index))
+        if series.notna().sum() >= 2:
+            series_list.append((location, commodity, series))
+    models = [build_model(series, get_commodity_category(commodity)) for _, commodity, series in series_list]
+    locations = [location for location, _, _ in series_list]
+    commodities = [commodity for _, commodity, _ in series_list]
+
+    try:
+        fits = fit_models(models, commodities, locations, backend)
+    except Exception as e:
+        # A joint fit fails as a whole; retry one series at a time to isolate the bad ones
+        print(f"Error fitting chunk jointly, refitting series individually: {e}")
+        fits = []
+        for model, commodity, location in zip(models, commodities, locations):
+            try:
+                fits.append(fit_model(model, commodity, location, backend))
+            except Exception as e:
+                print(f"Error forecasting {commodity} at {location or 'national'}: {e}")
+                fits.append(None)
+
+    results = []
+    for (location, commodity, series), fitted in zip(series_list, fits):
+        if fitted is None:
+            continue
+        last_year = series.index[-1].year
+        data_version = series_version(series.to_numpy())
+        forecast = np.asarray(fitted.forecast(steps=FORECAST_YEARS))
+        for step, price in enumerate(forecast, start=1):
+            results.append((location, commodity, data_version, last_year + step, float(price)))
+    return results
+
+def forecast_region(region=None, workers=None, chunk_size=CHUNK_SIZE, store=True, backend=MODEL_BACKEND):
+    """Forecasts every series in a region across processes and stores the results.
+
+    Returns a DataFrame of (location, commodity, data_version, year, forecast_price).
+    Raises ValueError up front if the backend cannot fit every series.
+    """
+    wide = load_region_series(region)
+    columns = ["location", "commodity", "data_version", "year", "forecast_price"]
+    if wide.empty:
+        return pd.DataFrame(columns=columns)
+    if backend == "batched":
+        check_batched_backend(wide)
+
+    keys = list(wide.columns)
+    values = wide.to_numpy()
+    chunks = [
+        (keys[start:start + chunk_size], values[:, start:start + chunk_size], wide.index, backend)
+        for start in range(0, len(keys), chunk_size)
+    ]
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for chunk_rows in executor.map(forecast_chunk, *zip(*chunks)):
+            rows.extend(chunk_rows)
+
+    if store and rows:
+        store_forecasts(BATCH_MODEL_VERSION, rows)
+    return pd.DataFrame(rows, columns=columns)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast every location x commodity series in a region.")
+    parser.add_argument("--region", help="Region prefix of the locations to forecast (default: all)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Series per worker task")
+    parser.add_argument("--backend", default=MODEL_BACKEND, choices=MODEL_BACKENDS,
+                        help="Model fitting backend (batched fits each chunk's series jointly and "
+                             "needs series longer than their orders' differencing and burn-in)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        result = forecast_region(args.region, workers=args.workers, chunk_size=args.chunk_size,
+                                 backend=args.backend)
+    except ValueError as e:
+        parser.error(str(e))
+    series_count = result.groupby(["location", "commodity"]).ngroups if not result.empty else 0
+    print(f"✅ Forecast {series_count} series in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,287 @@
+import numpy as np
+
+# Matches statsmodels' approximate diffuse initialization for SARIMAX with
+# enforce_stationarity=False (initial state 0, variance 1e6, first k_states
+# observations excluded from the likelihood).
+INITIAL_VARIANCE = 1e6
+# Like statsmodels, stop updating a series' covariance once it reaches steady state
+CONVERGENCE_TOL = 1e-12
+
+# Optimizer: parameters are constrained like build_model's SARIMAX (AR free, MA
+# invertible, sigma2 > 0); a series stops once its relative improvement < FTOL.
+FD_STEP = 1e-6
+FTOL = 1e-9
+MAX_BACKTRACKS = 20
+
+def difference(y, d, D, s):
+    """Applies (1 - L)^d (1 - L^s)^D to every row of a (n_series, nobs) array."""
+    y = np.asarray(y, dtype=float)
+    for _ in range(D):
+        y = y[:, s:] - y[:, :-s]
+    for _ in range(d):
+        y = np.diff(y, axis=1)
+    return y
+
+def _poly_mul(a, b):
+    """Multiplies batches of lag polynomials, shapes (B, m) x (B, n) -> (B, m + n - 1)."""
+    out = np.zeros((a.shape[0], a.shape[1] + b.shape[1] - 1))
+    for j in np.flatnonzero(np.any(b != 0, axis=0)):
+        out[:, j:j + a.shape[1]] += a * b[:, j:j + 1]
+    return out
+
+def split_params(params, order, seasonal_order):
+    """Splits (B, k) params in statsmodels order into ar, ma, seasonal ar, seasonal ma, sigma2."""
+    p, _, q = order
+    P, _, Q, _ = seasonal_order
+    bounds = np.cumsum([0, p, q, P, Q])
+    return [params[:, bounds[i]:bounds[i + 1]] for i in range(4)] + [params[:, -1]]
+
+def state_space(params, order, seasonal_order):
+    """Builds batched companion-form matrices for ARMA models on differenced data.
+
+    Returns transition (B, r, r) and selection (B, r) as in statsmodels' SARIMAX
+    with simple_differencing=True, plus sigma2 (B,).
+    """
+    s = seasonal_order[3]
+    ar, ma, seasonal_ar, seasonal_ma, sigma2 = split_params(params, order, seasonal_order)
+    n = params.shape[0]
+
+    def lag_poly(coefs, step, sign):
+        poly = np.zeros((n, coefs.shape[1] * step + 1))
+        poly[:, 0] = 1
+        if coefs.shape[1]:
+            poly[:, step::step] = sign * coefs
+        return poly
+
+    ar_poly = _poly_mul(lag_poly(ar, 1, -1), lag_poly(seasonal_ar, s, -1))
+    ma_poly = _poly_mul(lag_poly(ma, 1, 1), lag_poly(seasonal_ma, s, 1))
+    k_states = max(ar_poly.shape[1] - 1, ma_poly.shape[1], 1)
+
+    transition = np.zeros((n, k_states, k_states))
+    transition[:, :ar_poly.shape[1] - 1, 0] = -ar_poly[:, 1:]
+    transition[:, np.arange(k_states - 1), np.arange(1, k_states)] = 1
+    selection = np.zeros((n, k_states))
+    selection[:, :ma_poly.shape[1]] = ma_poly
+    return transition, selection, sigma2
+
+def _predict_cov(ar, cov, state_noise):
+    """Returns T P T' + R Q R' for companion transitions T with first column ar.
+
+    T is a shift plus a rank-one term, so both products avoid a full matmul.
+    """
+    tp = np.empty_like(cov)
+    tp[:, :-1] = cov[:, 1:]
+    tp[:, -1] = 0
+    tp += ar[:, :, None] * cov[:, None, 0, :]
+    out = np.empty_like(cov)
+    out[:, :, :-1] = tp[:, :, 1:]
+    out[:, :, -1] = 0
+    out += tp[:, :, :1] * ar[:, None, :]
+    return out + state_noise
+
+def min_nobs(order, seasonal_order):
+    """Returns the fewest observations that leave a likelihood past the differencing and burn-in."""
+    p, d, q = order
+    P, D, Q, s = seasonal_order
+    k_states = max(p + P * s, q + Q * s + 1)
+    return d + D * s + k_states + 1
+
+def supports(nobs, order, seasonal_order):
+    """Returns whether a series of nobs observations can be fit by fit_params."""
+    return nobs >= min_nobs(order, seasonal_order)
+
+def loglike(y, params, order, seasonal_order):
+    """Gaussian log-likelihood of every series at once, via one batched Kalman filter pass.
+
+    y is (B, nobs) already differenced (NaN marks missing values) and params is
+    (B, k) in statsmodels' SARIMAX order. Returns a (B,) array.
+    """
+    transition, selection, sigma2 = state_space(params, order, seasonal_order)
+    n, k_states = selection.shape
+    state_noise = sigma2[:, None, None] * selection[:, :, None] * selection[:, None, :]
+    ar = transition[:, :, 0]
+
+    state = np.zeros((n, k_states))
+    cov = np.broadcast_to(INITIAL_VARIANCE * np.eye(k_states), (n, k_states, k_states)).copy()
+    gain = np.zeros((n, k_states))
+    var = np.ones(n)
+    total = np.zeros(n)
+    # Rows whose covariance is still being updated; with missing values the
+    # recursion is not time-invariant, so no row is ever frozen
+    active = np.arange(n)
+    can_converge = not np.isnan(y).any()
+    for t in range(y.shape[1]):
+        observed = ~np.isnan(y[:, t])
+        if active.size:
+            # Observation is the first state, so F = P[0, 0] and K = P[:, 0] / F
+            var[active] = cov[:, 0, 0]
+            gain[active] = cov[:, :, 0] / cov[:, :1, 0]
+            # A missing observation carries no information, so its covariance is not updated
+            update = np.where(observed[active, None, None], gain[active][:, :, None] * cov[:, None, 0, :], 0.0)
+            predicted = _predict_cov(ar[active], cov - update, state_noise[active])
+            if can_converge and t >= k_states:
+                change = np.abs(predicted - cov).max(axis=(1, 2))
+                moving = change > CONVERGENCE_TOL * np.abs(predicted).max(axis=(1, 2))
+                active, predicted = active[moving], predicted[moving]
+            cov = predicted
+
+        resid = np.where(observed, y[:, t] - state[:, 0], 0.0)
+        state = state + np.where(observed[:, None], gain, 0.0) * resid[:, None]
+        if t >= k_states:
+            total += np.where(observed, -0.5 * (np.log(2 * np.pi * var) + resid ** 2 / var), 0.0)
+        state = np.concatenate([state[:, 1:], np.zeros((n, 1))], axis=1) + ar * state[:, :1]
+    return total
+
+def constrain_stationary(x):
+    """Batched statsmodels constrain_stationary_univariate over the rows of (B, m) x.
+
+    Maps any real vector to coefficients of a stationary lag polynomial
+    1 - c_1 L - ... - c_m L^m (Monahan 1984); -c is an invertible MA polynomial.
+    """
+    r = x / np.sqrt(1 + x ** 2)
+    y = np.zeros_like(r)
+    for k in range(r.shape[1]):
+        y[:, :k] = y[:, :k] + r[:, k:k + 1] * y[:, k - 1::-1][:, :k]
+        y[:, k] = r[:, k]
+    return -y
+
+def unconstrain_stationary(c):
+    """Inverse of constrain_stationary; rows outside the stationary region become NaN."""
+    y = -np.asarray(c, dtype=float)
+    r = np.empty_like(y)
+    for k in range(y.shape[1] - 1, -1, -1):
+        r[:, k] = y[:, k]
+        if k:
+            y = (y[:, :k] - y[:, k:k + 1] * y[:, k - 1::-1][:, :k]) / (1 - y[:, k:k + 1] ** 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return r / np.sqrt(1 - r ** 2)
+
+def _ma_blocks(order, seasonal_order):
+    """Returns the (start, end) columns of the MA and seasonal MA params."""
+    bounds = np.cumsum([0, order[0], order[2], seasonal_order[0], seasonal_order[2]])
+    return [(bounds[1], bounds[2]), (bounds[3], bounds[4])]
+
+def _to_params(x, order, seasonal_order):
+    """Maps unconstrained optimizer variables to SARIMAX params.
+
+    Matches statsmodels' transform_params for build_model's SARIMAX
+    (enforce_stationarity=False, enforce_invertibility=True): AR coefficients
+    are free, MA coefficients invertible and sigma2 positive.
+    """
+    params = x.copy()
+    for start, end in _ma_blocks(order, seasonal_order):
+        if end > start:
+            params[:, start:end] = -constrain_stationary(x[:, start:end])
+    params[:, -1] = np.exp(x[:, -1])
+    return params
+
+def _from_params(params, order, seasonal_order):
+    """Inverse of _to_params; non-invertible MA starting values are reset to zero."""
+    x = params.copy()
+    for start, end in _ma_blocks(order, seasonal_order):
+        if end > start:
+            block = unconstrain_stationary(-params[:, start:end])
+            x[:, start:end] = np.where(np.isfinite(block).all(axis=1, keepdims=True), block, 0.0)
+    x[:, -1] = np.log(np.maximum(params[:, -1], 1e-8))
+    return x
+
+def fit_params(endogs, order, seasonal_order, start_params=None, maxiter=100):
+    """Estimates SARIMAX parameters for many equal-length, equal-order series jointly.
+
+    endogs is (B, nobs) in levels. Each series gets its own BFGS iterate and
+    inverse Hessian, but all of them advance in lockstep: the objective and
+    every finite-difference gradient coordinate of every unconverged series
+    are one stacked filter pass. Returns (B, k) params usable with
+    SARIMAX(...).smooth(params).
+    """
+    y = difference(np.atleast_2d(endogs), order[1], seasonal_order[1], seasonal_order[3])
+    n = y.shape[0]
+    k = order[0] + order[2] + seasonal_order[0] + seasonal_order[2] + 1
+
+    if start_params is None:
+        start_params = np.zeros((n, k))
+        start_params[:, -1] = np.nanvar(y, axis=1)
+    x = _from_params(np.array(np.broadcast_to(start_params, (n, k)), dtype=float), order, seasonal_order)
+    steps = np.vstack([np.zeros(k), FD_STEP * np.eye(k)])
+
+    def value_and_grad(rows, points):
+        # Row block 0 is the point itself, block j + 1 shifts variable j
+        shifted = (points[None] + steps[:, None, :]).reshape(-1, k)
+        values = -loglike(np.tile(y[rows], (k + 1, 1)), _to_params(shifted, order, seasonal_order), order,
+                          seasonal_order).reshape(k + 1, len(rows))
+        value = np.where(np.isfinite(values[0]), values[0], np.inf)
+        grad = np.nan_to_num((values[1:] - values[0]) / FD_STEP, nan=0.0, posinf=0.0, neginf=0.0).T
+        return value, grad
+
+    active = np.arange(n)
+    value, grad = value_and_grad(active, x)
+    inv_hess = np.broadcast_to(np.eye(k), (n, k, k)).copy()
+    # First step is a unit-length gradient step; BFGS rescales from the first update
+    inv_hess /= np.maximum(np.linalg.norm(grad, axis=1), 1.0)[:, None, None]
+
+    for _ in range(maxiter):
+        if not active.size:
+            break
+        direction = -np.einsum("bij,bj->bi", inv_hess[active], grad[active])
+        slope = np.sum(direction * grad[active], axis=1)
+        # Not a descent direction: fall back to steepest descent
+        bad = slope >= 0
+        direction[bad] = -grad[active][bad]
+        slope[bad] = -np.sum(grad[active][bad] ** 2, axis=1)
+
+        # Backtracking (Armijo) line search, evaluating only rows still searching
+        alpha = np.ones(len(active))
+        new_x = x[active].copy()
+        new_value = np.full(len(active), np.inf)
+        new_grad = np.zeros((len(active), k))
+        searching = np.arange(len(active))
+        for _ in range(MAX_BACKTRACKS):
+            trial = x[active[searching]] + alpha[searching, None] * direction[searching]
+            trial_value, trial_grad = value_and_grad(active[searching], trial)
+            ok = trial_value <= value[active[searching]] + 1e-4 * alpha[searching] * slope[searching]
+            done = searching[ok]
+            new_x[done], new_value[done], new_grad[done] = trial[ok], trial_value[ok], trial_grad[ok]
+            searching = searching[~ok]
+            if not searching.size:
+                break
+            alpha[searching] /= 2
+
+        moved = np.isfinite(new_value)
+        rows = active[moved]
+        s = new_x[moved] - x[rows]
+        diff = new_grad[moved] - grad[rows]
+        improvement = value[rows] - new_value[moved]
+        x[rows], value[rows], grad[rows] = new_x[moved], new_value[moved], new_grad[moved]
+
+        # BFGS inverse Hessian update where the curvature condition holds
+        sy = np.sum(s * diff, axis=1)
+        curved = sy > 1e-12
+        if curved.any():
+            h = inv_hess[rows[curved]]
+            rho = 1 / sy[curved]
+            left = np.eye(k) - rho[:, None, None] * s[curved][:, :, None] * diff[curved][:, None, :]
+            inv_hess[rows[curved]] = (left @ h @ left.transpose(0, 2, 1)
+                                      + rho[:, None, None] * s[curved][:, :, None] * s[curved][:, None, :])
+
+        # Rows that could not move or barely improved are done
+        converged = improvement <= FTOL * np.maximum(np.abs(value[rows]), 1.0)
+        active = rows[~converged]
+    return _to_params(x, order, seasonal_order)
+
+if __name__ == "__main__":
+    # Timing on the bundled monthly data; accuracy is covered by test_batched_kalman.py
+    import time
+    import pandas as pd
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    endogs = pd.read_csv("datamain.csv").set_index("Commodities").T.ffill().bfill().to_numpy().T
+    order, seasonal_order = (1, 1, 1), (1, 1, 0, 12)
+
+    start = time.perf_counter()
+    fit_params(endogs, order, seasonal_order)
+    batched_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for series in endogs:
+        SARIMAX(series, order=order, seasonal_order=seasonal_order, enforce_stationarity=False).fit(disp=False)
+    print(f"Fit {len(endogs)} monthly series: batched {batched_seconds:.2f}s vs statsmodels "
+          f"{time.perf_counter() - start:.2f}s")
@@ -1,9 +1,14 @@
+import os
+import json
 import sqlite3
-import pandas as pd
-from werkzeug.security import generate_password_hash, check_password_hash
+import calendar
 from datetime import datetime
+import pandas as pd
+from hashing import hash_password, check_password, needs_rehash
 
 DB_FILE = "crop_predict.db"
+REQUIRED_TABLES = ["users", "otps", "forecasts", "user_forecasts", "commodity_prices", "price_rollups",
+                   "model_orders", "series_versions"]
 
 def create_tables():
     conn = sqlite3.connect(DB_FILE)
@@ -20,51 +25,266 @@ def create_tables():
                         is_verified BOOLEAN DEFAULT 0,
                         otp_expiry TIMESTAMP)''')
 
-    # Create predictions table (for storing model forecasts)
-    cursor.execute('''CREATE TABLE IF NOT EXISTS predictions (
+    # Create OTP table (short-lived verification codes, kept out of users)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS otps (
+                        contact TEXT PRIMARY KEY,
+                        otp TEXT NOT NULL,
+                        expires_at INTEGER NOT NULL)''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_otps_expires_at ON otps (expires_at)")
+
+    # Create forecasts table (one shared copy of each model forecast; location '' is national).
+    # Per-user forecast copies were replaced by forecasts + user_forecasts; they are derived data,
+    # so the old table is dropped rather than migrated.
+    cursor.execute("DROP TABLE IF EXISTS predictions")
+
+    # Forecasts are derived data, so a table from before locations existed is simply rebuilt.
+    if not has_column(cursor, "forecasts", "location"):
+        cursor.execute("DROP TABLE IF EXISTS forecasts")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS forecasts (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        commodity TEXT,
-                        year INTEGER,
+                        location TEXT NOT NULL DEFAULT '',
+                        commodity TEXT NOT NULL,
+                        model_version TEXT NOT NULL,
+                        data_version TEXT NOT NULL,
+                        year INTEGER NOT NULL,
                         forecast_price REAL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        UNIQUE (location, commodity, model_version, data_version, year))''')
+
+    # Create model_orders table (winning SARIMAX orders from automatic order selection)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS model_orders (
+                        location TEXT NOT NULL DEFAULT '',
+                        commodity TEXT NOT NULL,
+                        model_order TEXT NOT NULL,
+                        seasonal_order TEXT NOT NULL,
+                        aic REAL,
+                        candidates INTEGER,
+                        search_seconds REAL,
+                        data_version TEXT,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (location, commodity))''')
+
+    # Create user_forecasts table (per-user references into forecasts)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS user_forecasts (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER NOT NULL,
+                        commodity TEXT NOT NULL,
+                        model_version TEXT NOT NULL,
+                        data_version TEXT NOT NULL,
+                        requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        UNIQUE (user_id, commodity, model_version, data_version),
                         FOREIGN KEY (user_id) REFERENCES users(id))''')
 
-    # Create commodity prices table
+    # Create commodity prices table (dates are ISO, one row per location/commodity/date/source;
+    # location '' holds the national series)
     cursor.execute('''CREATE TABLE IF NOT EXISTS commodity_prices (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         date TEXT,
-                        location TEXT,
+                        location TEXT NOT NULL DEFAULT '',
                         commodity TEXT,
                         price REAL,
-                        source TEXT)''')
+                        source TEXT NOT NULL DEFAULT '',
+                        granularity TEXT)''')
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='ux_commodity_prices_location_key'")
+    if not cursor.fetchone():
+        migrate_commodity_prices(cursor)
+    # The unique key leads with location so each market's series is a contiguous index range
+    cursor.execute("""CREATE UNIQUE INDEX IF NOT EXISTS ux_commodity_prices_location_key
+                      ON commodity_prices (location, commodity, date, source)""")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_commodity_prices_location_commodity_date
+                      ON commodity_prices (location, LOWER(commodity), date)""")
+
+    # Create price rollups table (monthly/yearly aggregates kept in sync by upsert_prices).
+    # Rollups are derived data, so a table from before locations existed is rebuilt below.
+    if not has_column(cursor, "price_rollups", "location"):
+        cursor.execute("DROP TABLE IF EXISTS price_rollups")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS price_rollups (
+                        location TEXT NOT NULL DEFAULT '',
+                        commodity TEXT NOT NULL,
+                        level TEXT NOT NULL,
+                        period TEXT NOT NULL,
+                        mean_price REAL,
+                        min_price REAL,
+                        max_price REAL,
+                        count INTEGER,
+                        PRIMARY KEY (location, commodity, level, period))''')
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_price_rollups_location_lookup
+                      ON price_rollups (location, LOWER(commodity), level, period)""")
+    # Create series versions table (a fresh random token per (location, commodity) each time its
+    # rollups are rebuilt; cached forecasts and histories are keyed on it)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS series_versions (
+                        location TEXT NOT NULL DEFAULT '',
+                        commodity TEXT NOT NULL,
+                        version TEXT NOT NULL,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (location, commodity))''')
+
+    # Backfill rollups for databases that were populated before the table existed
+    if (cursor.execute("SELECT 1 FROM price_rollups LIMIT 1").fetchone() is None
+            and cursor.execute("SELECT 1 FROM commodity_prices LIMIT 1").fetchone() is not None):
+        refresh_rollups(cursor, cursor.execute(
+            "SELECT DISTINCT location, commodity, substr(date, 1, 4) FROM commodity_prices").fetchall())
 
     conn.commit()
     conn.close()
 
-def upload_csv_to_db(csv_file):
-    """Uploads CSV data to the commodity_prices table."""
+def has_column(cursor, table, column):
+    """Returns True if the table exists and has the column."""
+    return column in {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+
+def normalize_date(label):
+    """Converts a CSV date header to (ISO date, granularity).
+
+    Monthly headers like 'Jan-14' map to the month end and yearly headers like
+    '2014' to the year end, matching pandas' 'M'/'Y' period-end convention.
+    ISO dates are returned unchanged with granularity 'daily'.
+    """
+    label = str(label).strip()
+    try:
+        parsed = datetime.strptime(label, "%b-%y")
+        last_day = calendar.monthrange(parsed.year, parsed.month)[1]
+        return parsed.replace(day=last_day).strftime("%Y-%m-%d"), "monthly"
+    except ValueError:
+        pass
+    if label.isdigit() and len(label) == 4:
+        return f"{label}-12-31", "yearly"
+    return datetime.strptime(label, "%Y-%m-%d").strftime("%Y-%m-%d"), "daily"
+
+def migrate_commodity_prices(cursor):
+    """Brings an older commodity_prices table up to the current schema in place."""
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(commodity_prices)")}
+    for column, ddl in (("location", "TEXT NOT NULL DEFAULT ''"), ("source", "TEXT NOT NULL DEFAULT ''"),
+                        ("granularity", "TEXT")):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE commodity_prices ADD COLUMN {column} {ddl}")
+    cursor.execute("UPDATE commodity_prices SET source = '' WHERE source IS NULL")
+    cursor.execute("UPDATE commodity_prices SET location = '' WHERE location IS NULL")
+    # Superseded by the location-aware key and index
+    cursor.execute("DROP INDEX IF EXISTS ux_commodity_prices_key")
+    cursor.execute("DROP INDEX IF EXISTS idx_commodity_prices_commodity_date")
+
+    # Rewrite raw CSV header dates ('Jan-14', '2014') as ISO dates
+    cursor.execute("SELECT DISTINCT date FROM commodity_prices WHERE date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'")
+    for (label,) in cursor.fetchall():
+        try:
+            iso_date, granularity = normalize_date(label)
+        except ValueError:
+            continue
+        cursor.execute("UPDATE commodity_prices SET date = ?, granularity = COALESCE(granularity, ?) WHERE date = ?",
+                       (iso_date, granularity, label))
+    # Rows that were already ISO came from init_db's monthly sample generator
+    cursor.execute("UPDATE commodity_prices SET granularity = 'monthly' WHERE granularity IS NULL")
+    # Legacy rows have no source; monthly 'Dec-14' and yearly '2014' both became 2014-12-31,
+    # so tell the two CSV formats apart before deduplicating
+    cursor.execute("UPDATE commodity_prices SET source = 'legacy-' || granularity WHERE source = ''")
+
+    # Keep the first copy of any duplicated (location, commodity, date, source) row
+    cursor.execute("""DELETE FROM commodity_prices WHERE id NOT IN (
+                          SELECT MIN(id) FROM commodity_prices GROUP BY location, commodity, date, source)""")
+
+def upsert_prices(cursor, rows):
+    """Upserts (date, commodity, price, source, granularity, location) rows.
+
+    Returns a dict with inserted, updated and unchanged counts.
+    """
+    rows = list(rows)
+    before = cursor.execute("SELECT COUNT(*) FROM commodity_prices").fetchone()[0]
+    changes = cursor.connection.total_changes
+    cursor.executemany("""INSERT INTO commodity_prices (date, commodity, price, source, granularity, location)
+                          VALUES (?, ?, ?, ?, ?, ?)
+                          ON CONFLICT (location, commodity, date, source) DO UPDATE
+                          SET price = excluded.price, granularity = excluded.granularity
+                          WHERE price IS NOT excluded.price OR granularity IS NOT excluded.granularity""",
+                       rows)
+    changed = cursor.connection.total_changes - changes
+    inserted = cursor.execute("SELECT COUNT(*) FROM commodity_prices").fetchone()[0] - before
+    refresh_rollups(cursor, {(row[5], row[1], row[0][:4]) for row in rows})
+    return {"inserted": inserted, "updated": changed - inserted, "unchanged": len(rows) - changed}
+
+def refresh_rollups(cursor, keys):
+    """Recomputes the monthly and yearly rollups for the given (location, commodity, year) keys.
+
+    Monthly rollups aggregate daily and monthly rows. Yearly rollups aggregate
+    the finest granularity present in that year, so a yearly CSV value never
+    gets averaged with the monthly prices it summarizes.
+    """
+    cursor.execute("DROP TABLE IF EXISTS temp.rollup_keys")
+    cursor.execute("CREATE TEMP TABLE rollup_keys (location TEXT, commodity TEXT, year TEXT)")
+    cursor.executemany("INSERT INTO rollup_keys (location, commodity, year) VALUES (?, ?, ?)", list(keys))
+
+    cursor.execute("""DELETE FROM price_rollups WHERE EXISTS (
+                          SELECT 1 FROM rollup_keys k
+                          WHERE k.location = price_rollups.location AND k.commodity = price_rollups.commodity
+                            AND k.year = substr(price_rollups.period, 1, 4))""")
+    cursor.execute("""INSERT INTO price_rollups (location, commodity, level, period, mean_price, min_price, max_price, count)
+                      SELECT p.location, p.commodity, 'monthly', date(p.date, 'start of month', '+1 month', '-1 day'),
+                             AVG(p.price), MIN(p.price), MAX(p.price), COUNT(*)
+                      FROM commodity_prices p
+                      JOIN rollup_keys k
+                        ON k.location = p.location AND k.commodity = p.commodity AND k.year = substr(p.date, 1, 4)
+                      WHERE p.granularity IN ('daily', 'monthly')
+                      GROUP BY p.location, p.commodity, date(p.date, 'start of month', '+1 month', '-1 day')""")
+    cursor.execute("""WITH ranked AS (
+                          SELECT p.location, p.commodity, substr(p.date, 1, 4) AS year, p.price,
+                                 CASE p.granularity WHEN 'daily' THEN 0 WHEN 'monthly' THEN 1 ELSE 2 END AS rank
+                          FROM commodity_prices p
+                          JOIN rollup_keys k
+                            ON k.location = p.location AND k.commodity = p.commodity AND k.year = substr(p.date, 1, 4)
+                      ),
+                      finest AS (
+                          SELECT location, commodity, year, MIN(rank) AS rank FROM ranked GROUP BY location, commodity, year
+                      )
+                      INSERT INTO price_rollups (location, commodity, level, period, mean_price, min_price, max_price, count)
+                      SELECT r.location, r.commodity, 'yearly', r.year || '-12-31',
+                             AVG(r.price), MIN(r.price), MAX(r.price), COUNT(*)
+                      FROM ranked r
+                      JOIN finest f ON f.location = r.location AND f.commodity = r.commodity
+                                   AND f.year = r.year AND f.rank = r.rank
+                      GROUP BY r.location, r.commodity, r.year""")
+    cursor.execute("""INSERT INTO series_versions (location, commodity, version)
+                      SELECT DISTINCT location, LOWER(commodity), lower(hex(randomblob(8))) FROM rollup_keys WHERE 1
+                      ON CONFLICT (location, commodity) DO UPDATE
+                      SET version = excluded.version, updated_at = CURRENT_TIMESTAMP""")
+    cursor.execute("DELETE FROM rollup_keys")
+
+def upload_csv_to_db(csv_file, location=""):
+    """Upserts CSV data into the commodity_prices table; safe to re-run.
+
+    Rows go to the given location ('' for the national series) unless the CSV
+    has its own "Location" column.
+    """
     conn = sqlite3.connect(DB_FILE)
     cursor = conn.cursor()
 
     try:
         df = pd.read_csv(csv_file)
 
-        # Rename "Commodities" column for consistency
-        df.rename(columns={"Commodities": "commodity"}, inplace=True)
+        # Rename "Commodities"/"Location" columns for consistency
+        df.rename(columns={"Commodities": "commodity", "Location": "location"}, inplace=True)
+        if "location" not in df.columns:
+            df["location"] = location
+        df["location"] = df["location"].fillna("")
 
         # Convert wide format (months as columns) to long format (date, commodity, price)
-        df_long = df.melt(id_vars=["commodity"], var_name="date", value_name="price")
+        df_long = df.melt(id_vars=["location", "commodity"], var_name="date", value_name="price")
 
         # Ensure no empty commodity names
         df_long = df_long.dropna(subset=["commodity", "price"])
 
-        # Insert data into the database
-        for index, row in df_long.iterrows():
-            cursor.execute("INSERT INTO commodity_prices (date, commodity, price) VALUES (?, ?, ?)",
-                           (row["date"], row["commodity"], row["price"]))
+        # Normalize each distinct header once rather than once per row
+        normalized = {label: normalize_date(label) for label in df_long["date"].unique()}
+        source = os.path.basename(csv_file)
+        rows = (
+            (normalized[label][0], commodity, float(price), source, normalized[label][1], str(loc))
+            for label, commodity, price, loc in zip(df_long["date"], df_long["commodity"], df_long["price"],
+                                                    df_long["location"])
+        )
 
+        counts = upsert_prices(cursor, rows)
         conn.commit()
-        print(f"✅ Data from {csv_file} uploaded successfully!")
+        print(f"✅ Data from {csv_file} uploaded successfully! "
+              f"({counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged)")
+        return counts
 
     except Exception as e:
         print(f"❌ Error uploading {csv_file}: {e}")
@@ -73,54 +293,128 @@ def upload_csv_to_db(csv_file):
         conn.close()
 
 
-def register_user(username, password, contact):
-    """Registers a new user with hashed password."""
+def get_forecast(commodity, model_version, data_version, location=""):
+    """Returns the shared (year, forecast_price) rows for a commodity, or [] if not cached."""
     conn = sqlite3.connect(DB_FILE)
     cursor = conn.cursor()
-    hashed_password = generate_password_hash(password)
-
     try:
-        cursor.execute("INSERT INTO users (username, password, plaintext_password, contact) VALUES (?, ?, ?, ?)",
-                       (username, hashed_password, password, contact))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False  # Username/contact already exists
+        cursor.execute("""SELECT year, forecast_price FROM forecasts
+                          WHERE location = ? AND commodity = ? AND model_version = ? AND data_version = ?
+                          ORDER BY year""",
+                       (location, commodity, model_version, data_version))
+        return cursor.fetchall()
     finally:
         conn.close()
 
-def store_otp(contact, otp, expiry):
-    """Stores OTP for verification."""
+def store_forecast(commodity, model_version, data_version, rows, location=""):
+    """Bulk upserts (year, forecast_price) rows into the shared forecasts table."""
+    return store_forecasts(model_version, ((location, commodity, data_version, year, price) for year, price in rows))
+
+def store_forecasts(model_version, rows):
+    """Bulk upserts (location, commodity, data_version, year, forecast_price) rows in one transaction."""
     conn = sqlite3.connect(DB_FILE)
     cursor = conn.cursor()
     try:
-        cursor.execute("UPDATE users SET otp = ?, otp_expiry = ? WHERE contact = ?",
-                       (otp, expiry, contact))
+        cursor.executemany("""INSERT INTO forecasts (location, commodity, model_version, data_version, year, forecast_price)
+                              VALUES (?, ?, ?, ?, ?, ?)
+                              ON CONFLICT (location, commodity, model_version, data_version, year)
+                              DO UPDATE SET forecast_price = excluded.forecast_price,
+                                            created_at = CURRENT_TIMESTAMP""",
+                           [(location, commodity, model_version, data_version, int(year), float(price))
+                            for location, commodity, data_version, year, price in rows])
         conn.commit()
         return True
     except Exception as e:
-        print(f"Error storing OTP: {e}")
+        print(f"Error storing forecast: {e}")
         return False
     finally:
         conn.close()
 
-def verify_otp(contact, otp):
-    """Verifies OTP and marks user as verified if correct."""
+def get_series_version(commodity, location=""):
+    """Returns the current data version token of a series, or '' if it has none yet."""
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        row = conn.execute("SELECT version FROM series_versions WHERE location = ? AND commodity = ?",
+                           (location, commodity.lower())).fetchone()
+    except sqlite3.OperationalError:
+        # Database created before series versions existed
+        return ""
+    finally:
+        conn.close()
+    return row[0] if row else ""
+
+def get_model_order(commodity, location="", data_version=None):
+    """Returns the cached auto-selected (order, seasonal_order) for a series, or None.
+
+    With data_version, an order searched on different data counts as not cached.
+    """
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        row = conn.execute("""SELECT model_order, seasonal_order, data_version FROM model_orders
+                              WHERE location = ? AND commodity = ?""",
+                           (location, commodity.lower())).fetchone()
+    finally:
+        conn.close()
+    if not row or (data_version is not None and row[2] != data_version):
+        return None
+    return tuple(json.loads(row[0])), tuple(json.loads(row[1]))
+
+def store_model_order(commodity, order, seasonal_order, aic, candidates, search_seconds, data_version,
+                      location=""):
+    """Caches the winning order of an automatic order search."""
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        conn.execute("""INSERT INTO model_orders (location, commodity, model_order, seasonal_order, aic,
+                                                  candidates, search_seconds, data_version)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (location, commodity) DO UPDATE SET
+                            model_order = excluded.model_order, seasonal_order = excluded.seasonal_order,
+                            aic = excluded.aic, candidates = excluded.candidates,
+                            search_seconds = excluded.search_seconds, data_version = excluded.data_version,
+                            updated_at = CURRENT_TIMESTAMP""",
+                     (location, commodity.lower(), json.dumps(list(order)), json.dumps(list(seasonal_order)),
+                      aic, candidates, search_seconds, data_version))
+        conn.commit()
+    finally:
+        conn.close()
+
+def list_model_orders():
+    """Returns every cached order search result, slowest search first."""
+    conn = sqlite3.connect(DB_FILE)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute("SELECT * FROM model_orders ORDER BY search_seconds DESC").fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+def link_user_forecast(user_id, commodity, model_version, data_version):
+    """Records that a user requested a shared forecast."""
     conn = sqlite3.connect(DB_FILE)
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT otp, otp_expiry FROM users WHERE contact = ?", (contact,))
-        result = cursor.fetchone()
-        if not result:
-            return False
-        
-        stored_otp, expiry = result
-        if stored_otp == otp and datetime.now() < datetime.strptime(expiry, '%Y-%m-%d %H:%M:%S'):
-            cursor.execute("UPDATE users SET is_verified = 1, otp = NULL, otp_expiry = NULL WHERE contact = ?",
-                          (contact,))
-            conn.commit()
-            return True
-        return False
+        cursor.execute("""INSERT INTO user_forecasts (user_id, commodity, model_version, data_version)
+                          VALUES (?, ?, ?, ?)
+                          ON CONFLICT (user_id, commodity, model_version, data_version)
+                          DO UPDATE SET requested_at = CURRENT_TIMESTAMP""",
+                       (user_id, commodity, model_version, data_version))
+        conn.commit()
+    finally:
+        conn.close()
+
+def register_user(username, password, contact):
+    """Registers a new user with hashed password."""
+    hashed_password = hash_password(password)
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("INSERT INTO users (username, password, plaintext_password, contact) VALUES (?, ?, ?, ?)",
+                       (username, hashed_password, password, contact))
+        conn.commit()
+        return True
+    except sqlite3.IntegrityError:
+        return False  # Username/contact already exists
     finally:
         conn.close()
 
@@ -132,25 +426,37 @@ def login_user(username, password):
     user = cursor.fetchone()
     conn.close()
 
-    if user and check_password_hash(user[1], password):
+    if user and check_password(user[1], password):
+        if needs_rehash(user[1]):
+            update_password_hash(user[0], hash_password(password))
         return user[0]  # Return user ID if login is successful
     return None
 
+def update_password_hash(user_id, hashed_password):
+    """Replaces a user's stored hash, e.g. after the hash cost parameters change."""
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE users SET password = ? WHERE id = ?", (hashed_password, user_id))
+        conn.commit()
+    finally:
+        conn.close()
+
 def verify_database():
-    """Verifies database setup and creates tables if they don't exist."""
+    """Verifies database setup, creating missing tables and migrating older schemas."""
     try:
         print("Attempting to connect to database...")
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
         
-        # Check if users table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'")
-        if not cursor.fetchone():
-            print("Users table not found. Creating tables...")
-            create_tables()
-            print("Database tables created successfully")
-        else:
-            print("Database tables already exist")
+        # Check that every table exists (older databases may predate some of them)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        missing = set(REQUIRED_TABLES) - {row[0] for row in cursor.fetchall()}
+        if missing:
+            print(f"Tables not found: {sorted(missing)}. Creating tables...")
+        # Also brings existing tables up to the current schema (columns, indexes, rollups)
+        create_tables()
+        print("Database tables created successfully" if missing else "Database tables are up to date")
             
         # Verify table structure
         cursor.execute("PRAGMA table_info(users)")
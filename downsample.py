@@ -0,0 +1,51 @@
+import numpy as np
+
+def lttb(x, y, n_out):
+    """Returns the indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    x and y are 1-D numeric arrays sorted by x. The first and last points are
+    always kept; every bucket in between contributes the point that forms the
+    largest triangle with the previously kept point and the next bucket's mean.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket boundaries for the n - 2 interior points, plus each next bucket's centroid
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    counts = np.diff(edges)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    next_x = np.append(sums_x[1:] / counts[1:], x[-1])
+    next_y = np.append(sums_y[1:] / counts[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Twice the triangle area for every candidate in the bucket at once
+        areas = np.abs(
+            (x[prev] - next_x[i]) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (next_y[i] - y[prev])
+        )
+        prev = start + int(np.argmax(areas))
+        selected[i + 1] = prev
+    return selected
+
+def downsample_points(points, max_points):
+    """Downsamples a list of {"date", "price"} dicts to at most max_points with LTTB."""
+    if not max_points or len(points) <= max_points:
+        return points
+
+    dates = np.array([point["date"] for point in points])
+    try:
+        x = dates.astype("datetime64[D]").astype(float)
+    except ValueError:
+        # Non-ISO dates: fall back to positions, which suits evenly spaced series
+        x = np.arange(len(points), dtype=float)
+    y = np.array([point["price"] for point in points], dtype=float)
+    return [points[i] for i in lttb(x, y, max_points)]
@@ -0,0 +1,122 @@
+import hashlib
+import os
+
+import numpy as np
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+import batched_kalman
+import model_store
+
+# Commodity groups that share model orders and seasonal adjustments
+COMMODITY_CATEGORIES = {
+    'vegetables': ['onion', 'potato', 'tomato'],
+    'pulses': ['gram dal', 'tur/arhar dal', 'urad dal', 'moong dal', 'masoor dal'],
+    'oils': ['groundnut oil', 'mustard oil', 'vanaspati', 'soya oil', 'sunflower oil', 'palm oil'],
+    'cereals': ['rice', 'wheat'],
+    'others': ['sugar', 'gur', 'tea loose', 'milk', 'salt pack (iodised)']
+}
+
+# (order, seasonal_order) per category; volatile categories get the richer model
+SARIMAX_ORDERS = {
+    'vegetables': ((2, 1, 2), (2, 1, 1, 12)),
+    'pulses': ((2, 1, 2), (2, 1, 1, 12)),
+}
+DEFAULT_SARIMAX_ORDER = ((1, 1, 1), (1, 1, 0, 12))
+
+# "statsmodels" fits each model on its own; "batched" estimates same-shaped models
+# jointly with the batched Kalman filter in batched_kalman.py. The batched filter needs
+# observations past the differencing and burn-in, which the seasonal category orders do
+# not leave on the ~12-point yearly series: batch_forecast.py --backend batched rejects
+# every national series, and /predict_prices accepts backend=batched only with orders=auto.
+MODEL_BACKENDS = ("statsmodels", "batched")
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "statsmodels")
+
+def get_commodity_category(commodity):
+    """Returns the category name for a commodity, defaulting to 'others'."""
+    commodity = commodity.lower()
+    for category, items in COMMODITY_CATEGORIES.items():
+        if commodity in items:
+            return category
+    return 'others'
+
+def get_model_orders(category):
+    """Returns the (order, seasonal_order) used for a category."""
+    return SARIMAX_ORDERS.get(category, DEFAULT_SARIMAX_ORDER)
+
+def build_model(series, category, orders=None):
+    """Builds the (unfitted) SARIMAX model for a price series.
+
+    orders is an (order, seasonal_order) pair, e.g. from automatic order selection;
+    by default the category-specific orders are used.
+    """
+    order, seasonal_order = orders or get_model_orders(category)
+    return SARIMAX(
+        series,
+        order=order,
+        seasonal_order=seasonal_order,
+        enforce_stationarity=False
+    )
+
+def series_version(values):
+    """Returns a short content hash identifying the data a model was fit on."""
+    return hashlib.sha1(np.ascontiguousarray(values, dtype=float).tobytes()).hexdigest()[:16]
+
+def check_backend(model, backend=None):
+    """Raises ValueError if the backend cannot fit the model.
+
+    The batched backend needs a likelihood after differencing and burn-in, which
+    short series with seasonal orders (e.g. the category orders on ~12 yearly
+    points) do not have; those must be fit with statsmodels.
+    """
+    backend = backend or MODEL_BACKEND
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"backend must be one of {', '.join(MODEL_BACKENDS)}")
+    if backend == "batched" and not batched_kalman.supports(model.nobs, model.order, model.seasonal_order):
+        raise ValueError(f"backend 'batched' needs at least "
+                         f"{batched_kalman.min_nobs(model.order, model.seasonal_order)} observations for "
+                         f"SARIMAX{tuple(model.order)}x{tuple(model.seasonal_order)}, got {model.nobs}")
+
+def fit_model(model, commodity, location="", backend=None):
+    """Fits a model, reusing or warm-starting from the saved artifact for the series."""
+    return fit_models([model], [commodity], [location], backend)[0]
+
+def fit_models(models, commodities, locations, backend=None):
+    """Fits models, reusing or warm-starting from the saved artifact for each series.
+
+    Unchanged data reuses the saved parameters without optimizing; new data starts
+    the optimizer from them. With the batched backend, models sharing orders and
+    length are estimated together; ValueError is raised up front if any model is
+    too short for it (see check_backend). The fitted parameters are saved back to disk.
+    """
+    backend = backend or MODEL_BACKEND
+    for model in models:
+        check_backend(model, backend)
+    results = [None] * len(models)
+    batches = {}
+    for i, (model, commodity, location) in enumerate(zip(models, commodities, locations)):
+        data_version = series_version(model.endog)
+        artifact = model_store.get_artifact(location, commodity, model.order, model.seasonal_order)
+        usable = artifact is not None and len(artifact["params"]) == len(model.param_names)
+
+        if usable and artifact["data_version"] == data_version:
+            results[i] = model.smooth(artifact["params"])
+            continue
+
+        start_params = artifact["params"] if usable else None
+        if backend == "batched":
+            key = (tuple(model.order), tuple(model.seasonal_order), model.nobs)
+            batches.setdefault(key, []).append((i, start_params, data_version))
+            continue
+
+        results[i] = model.fit(start_params=start_params, disp=False)
+        model_store.save_artifact(location, commodity, results[i].params, model.order, model.seasonal_order,
+                                  data_version)
+
+    for (order, seasonal_order, _), batch in batches.items():
+        endogs = np.vstack([np.asarray(models[i].endog)[:, 0] for i, _, _ in batch])
+        start_params = np.vstack([models[i].start_params if start is None else start for i, start, _ in batch])
+        params = batched_kalman.fit_params(endogs, order, seasonal_order, start_params)
+        for (i, _, data_version), row in zip(batch, params):
+            results[i] = models[i].smooth(row)
+            model_store.save_artifact(locations[i], commodities[i], row, order, seasonal_order, data_version)
+    return results
@@ -0,0 +1,66 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Hash cost parameters (changing these makes existing hashes get upgraded on next login)
+HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:260000")
+HASH_SALT_LENGTH = int(os.environ.get("PASSWORD_HASH_SALT_LENGTH", "16"))
+
+# Pool sizing: at most HASH_WORKERS hashes run at once, at most HASH_QUEUE_LIMIT wait or run
+HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+HASH_QUEUE_LIMIT = int(os.environ.get("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", "10"))
+
+class HashPoolFull(Exception):
+    """Raised when the hashing queue is full and the request should be retried later."""
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="pwhash")
+_slots = threading.BoundedSemaphore(HASH_QUEUE_LIMIT)
+_stats_lock = threading.Lock()
+_stats = {"queued": 0, "running": 0, "completed": 0, "rejected": 0}
+
+def _bump(key, delta=1):
+    with _stats_lock:
+        _stats[key] += delta
+
+def _run(func, *args):
+    _bump("queued", -1)
+    _bump("running")
+    try:
+        return func(*args)
+    finally:
+        _bump("running", -1)
+        _bump("completed")
+        _slots.release()
+
+def _submit(func, *args):
+    """Runs func on the hashing pool and waits for the result."""
+    if not _slots.acquire(blocking=False):
+        _bump("rejected")
+        raise HashPoolFull("Too many concurrent password hashing requests")
+    _bump("queued")
+    return _executor.submit(_run, func, *args).result(timeout=HASH_TIMEOUT)
+
+def hash_password(password):
+    """Hashes a password with the configured cost parameters on the worker pool."""
+    return _submit(generate_password_hash, password, HASH_METHOD, HASH_SALT_LENGTH)
+
+def check_password(pwhash, password):
+    """Checks a password against a stored hash on the worker pool."""
+    return _submit(check_password_hash, pwhash, password)
+
+def needs_rehash(pwhash):
+    """Returns True if a stored hash was made with different cost parameters."""
+    if pwhash.count("$") < 2:
+        return True
+    method, salt, _ = pwhash.split("$", 2)
+    return method != HASH_METHOD or len(salt) != HASH_SALT_LENGTH
+
+def pool_stats():
+    """Returns a snapshot of the hashing pool's queue depth and counters."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["workers"] = HASH_WORKERS
+    stats["queue_limit"] = HASH_QUEUE_LIMIT
+    return stats
@@ -2,8 +2,7 @@ import sqlite3
 import pandas as pd
 from datetime import datetime, timedelta
 import numpy as np
-
-DB_FILE = "crop_predict.db"
+from database import DB_FILE, create_tables, upsert_prices
 
 def init_database():
     # Connect to database
@@ -12,13 +11,12 @@ def init_database():
     
     # Drop existing table to start fresh
     cursor.execute('DROP TABLE IF EXISTS commodity_prices')
+    cursor.execute('DROP TABLE IF EXISTS price_rollups')
+    conn.commit()
     
     # Create tables if they don't exist
-    cursor.execute('''CREATE TABLE IF NOT EXISTS commodity_prices (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        date TEXT,
-                        commodity TEXT,
-                        price REAL)''')
+    create_tables()
+    rows = []
     
     # Generate sample data for the last 2 years
     commodities = [
@@ -68,9 +66,10 @@ def init_database():
             
             price = base_price * trend_factor * seasonal_factor * random_factor
             
-            # Insert the data
-            cursor.execute('''INSERT INTO commodity_prices (date, commodity, price)
-                            VALUES (?, ?, ?)''', (date, commodity, round(price, 2)))
+            rows.append((date, commodity, round(price, 2), "sample", "monthly", ""))
+    
+    # Insert the data
+    upsert_prices(cursor, rows)
     
     # Commit changes and close connection
     conn.commit()
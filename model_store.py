@@ -0,0 +1,95 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+# Directory holding one .npz artifact per fitted (location, commodity, orders) model; the
+# category orders, automatically selected orders and batch forecasts each keep their own
+MODEL_DIR = os.environ.get("MODEL_ARTIFACT_DIR", "models")
+
+_artifacts = {}  # (location, commodity, order, seasonal_order) -> artifact dict
+_lock = threading.Lock()
+
+def _key(location, commodity, order, seasonal_order):
+    return (location, commodity.lower(), tuple(int(v) for v in order), tuple(int(v) for v in seasonal_order))
+
+def artifact_path(location, commodity, order, seasonal_order):
+    """Returns the artifact file for a model (hashed so any name is a safe filename)."""
+    key = _key(location, commodity, order, seasonal_order)
+    digest = hashlib.sha1("|".join(map(str, key)).encode()).hexdigest()[:20]
+    return os.path.join(MODEL_DIR, f"{digest}.npz")
+
+def _read(path):
+    with np.load(path, allow_pickle=False) as data:
+        return {
+            "location": str(data["location"]),
+            "commodity": str(data["commodity"]),
+            "params": data["params"],
+            "order": tuple(int(v) for v in data["order"]),
+            "seasonal_order": tuple(int(v) for v in data["seasonal_order"]),
+            "data_version": str(data["data_version"]),
+        }
+
+def load_artifacts():
+    """Loads every artifact in MODEL_DIR into memory (call once at startup)."""
+    if not os.path.isdir(MODEL_DIR):
+        return 0
+    loaded = {}
+    for name in os.listdir(MODEL_DIR):
+        if not name.endswith(".npz"):
+            continue
+        try:
+            artifact = _read(os.path.join(MODEL_DIR, name))
+        except Exception as e:
+            print(f"Skipping unreadable model artifact {name}: {e}")
+            continue
+        path = artifact_path(artifact["location"], artifact["commodity"], artifact["order"],
+                             artifact["seasonal_order"])
+        if os.path.basename(path) != name:
+            # Written before artifacts were keyed on their orders; the next fit replaces it
+            continue
+        loaded[_key(artifact["location"], artifact["commodity"], artifact["order"],
+                    artifact["seasonal_order"])] = artifact
+    with _lock:
+        _artifacts.update(loaded)
+    return len(loaded)
+
+def get_artifact(location, commodity, order, seasonal_order):
+    """Returns the saved artifact for a series fit with the given orders, or None."""
+    key = _key(location, commodity, order, seasonal_order)
+    path = artifact_path(location, commodity, order, seasonal_order)
+    with _lock:
+        artifact = _artifacts.get(key)
+    if artifact is None and os.path.exists(path):
+        # Written by another process since startup
+        artifact = _read(path)
+        with _lock:
+            _artifacts[key] = artifact
+    return artifact
+
+def save_artifact(location, commodity, params, order, seasonal_order, data_version):
+    """Atomically writes a fitted model's parameters to disk and the in-memory cache."""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    artifact = {
+        "location": location,
+        "commodity": commodity,
+        "params": np.asarray(params, dtype=float),
+        "order": tuple(order),
+        "seasonal_order": tuple(seasonal_order),
+        "data_version": data_version,
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=MODEL_DIR, suffix=".npz.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **{k: np.asarray(v) for k, v in artifact.items()})
+        # mkstemp creates the file owner-only; artifacts are shared with other users' processes
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, artifact_path(location, commodity, order, seasonal_order))
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    with _lock:
+        _artifacts[_key(location, commodity, order, seasonal_order)] = artifact
+    return artifact
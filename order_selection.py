@@ -0,0 +1,136 @@
+import argparse
+import itertools
+import os
+import sqlite3
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from database import DB_FILE, get_model_order, store_model_order
+from forecasting import get_commodity_category, get_model_orders, series_version
+
+# Candidate grid for automatic order selection
+ORDER_GRID = list(itertools.product((0, 1, 2), (0, 1), (0, 1, 2)))
+SEASONAL_GRID = list(itertools.product((0, 1), (0, 1), (0, 1)))
+SEASONAL_PERIOD = 12
+
+# Screening fits are capped at SCREEN_MAXITER iterations; only candidates within
+# AIC_MARGIN of the best screened AIC (at most FINALISTS of them) get a full fit.
+SCREEN_MAXITER = 20
+FULL_MAXITER = 200
+AIC_MARGIN = 4.0
+FINALISTS = 4
+SEARCH_WORKERS = int(os.environ.get("ORDER_SEARCH_WORKERS", os.cpu_count() or 1))
+
+def candidate_orders(nobs):
+    """Returns the (order, seasonal_order) grid that the series is long enough to fit."""
+    seasonal_grid = SEASONAL_GRID if nobs >= 3 * SEASONAL_PERIOD else [(0, 0, 0)]
+    candidates = []
+    for (p, d, q), (P, D, Q) in itertools.product(ORDER_GRID, seasonal_grid):
+        # Drop models with fewer than two usable observations per parameter
+        n_params = p + q + P + Q + 1
+        usable = nobs - d - D * SEASONAL_PERIOD
+        if usable < 2 * n_params:
+            continue
+        seasonal_order = (P, D, Q, SEASONAL_PERIOD) if (P, D, Q) != (0, 0, 0) else (0, 0, 0, 0)
+        candidates.append(((p, d, q), seasonal_order))
+    return candidates
+
+def fit_candidate(endog, order, seasonal_order, maxiter):
+    """Fits one candidate and returns (aic, converged); runs in a worker process."""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            fitted = SARIMAX(endog, order=order, seasonal_order=seasonal_order,
+                             enforce_stationarity=False).fit(disp=False, maxiter=maxiter)
+        aic = float(fitted.aic)
+        return (aic if np.isfinite(aic) else np.inf), bool(fitted.mle_retvals.get("converged", False))
+    except Exception:
+        return np.inf, False
+
+def search_orders(endog, workers=SEARCH_WORKERS):
+    """Searches the candidate grid in parallel with AIC-based early pruning.
+
+    Returns a dict with order, seasonal_order, aic, candidates and seconds, or
+    None if no candidate could be fit.
+    """
+    start = time.perf_counter()
+    endog = np.asarray(endog, dtype=float)
+    candidates = candidate_orders(len(endog))
+    if not candidates:
+        return None
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def run(batch, maxiter):
+            return list(executor.map(fit_candidate, itertools.repeat(endog), *zip(*batch),
+                                     itertools.repeat(maxiter)))
+
+        # Stage 1: cheap capped fits of every candidate
+        screened = sorted(zip(run(candidates, SCREEN_MAXITER), candidates), key=lambda item: item[0][0])
+        best_aic = screened[0][0][0]
+        if not np.isfinite(best_aic):
+            return None
+        finalists = [candidate for (aic, _), candidate in screened if aic <= best_aic + AIC_MARGIN][:FINALISTS]
+
+        # Stage 2: full fits of the survivors; unconverged fits only win if nothing converged
+        results = sorted(zip(run(finalists, FULL_MAXITER), finalists),
+                         key=lambda item: (not item[0][1], item[0][0]))
+
+    (aic, _), (order, seasonal_order) = results[0]
+    return {
+        "order": order,
+        "seasonal_order": seasonal_order,
+        "aic": aic,
+        "candidates": len(candidates),
+        "seconds": time.perf_counter() - start,
+    }
+
+def select_orders(series, commodity, location="", refresh=False):
+    """Returns (order, seasonal_order) for a yearly series, searching once per version of its data.
+
+    The cached order is reused only while the series is unchanged; new data triggers a new search.
+    """
+    data_version = series_version(series)
+    if not refresh:
+        cached = get_model_order(commodity, location, data_version)
+        if cached:
+            return cached
+
+    result = search_orders(series)
+    if result is None:
+        return get_model_orders(get_commodity_category(commodity))
+
+    store_model_order(commodity, result["order"], result["seasonal_order"], result["aic"],
+                      result["candidates"], result["seconds"], data_version, location)
+    print(f"Order search for {commodity} ({location or 'national'}): {result['order']}x{result['seasonal_order']} "
+          f"AIC {result['aic']:.1f}, {result['candidates']} candidates in {result['seconds']:.2f}s")
+    return result["order"], result["seasonal_order"]
+
+if __name__ == "__main__":
+    # The only place searches run: /predict_prices?orders=auto reads the stored orders and
+    # uses the category orders for series this has not covered yet
+    parser = argparse.ArgumentParser(description="Run automatic order selection for every yearly series.")
+    parser.add_argument("--location", help="Only search this location ('' for the national series)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Search again even if the stored order was found on the current data")
+    args = parser.parse_args()
+
+    # Orders are searched on the yearly series that /predict_prices fits
+    query = "SELECT location, commodity, period, mean_price FROM price_rollups WHERE level = 'yearly'"
+    params = []
+    if args.location is not None:
+        query += " AND location = ?"
+        params.append(args.location)
+    conn = sqlite3.connect(DB_FILE)
+    df = pd.read_sql_query(query + " ORDER BY location, commodity, period", conn, params=params,
+                           parse_dates={"period": "%Y-%m-%d"})
+    conn.close()
+
+    for (location, commodity), group in df.groupby(["location", "commodity"]):
+        # Gap-filled the same way as /predict_prices so the stored data_version matches its series
+        series = group.set_index("period")["mean_price"].asfreq('Y').ffill().bfill()
+        select_orders(series.values, commodity, location, refresh=args.refresh)
@@ -0,0 +1,118 @@
+import hmac
+import os
+import sqlite3
+import threading
+import time
+
+from database import DB_FILE
+
+# "sqlite" keeps codes in the otps table, "memory" keeps them in this process only
+OTP_BACKEND = os.environ.get("OTP_BACKEND", "sqlite")
+OTP_TTL_SECONDS = 5 * 60
+OTP_SWEEP_INTERVAL = 60
+
+_memory_otps = {}  # contact -> (otp, expires_at)
+_memory_lock = threading.Lock()
+_sweeper = None
+
+def store_otp(contact, otp, expires_at):
+    """Stores (or replaces) the OTP for a contact; expires_at is epoch seconds."""
+    if OTP_BACKEND == "memory":
+        with _memory_lock:
+            _memory_otps[contact] = (otp, int(expires_at))
+        return True
+
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""INSERT INTO otps (contact, otp, expires_at) VALUES (?, ?, ?)
+                          ON CONFLICT (contact) DO UPDATE SET otp = excluded.otp,
+                                                              expires_at = excluded.expires_at""",
+                       (contact, otp, int(expires_at)))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error storing OTP: {e}")
+        return False
+    finally:
+        conn.close()
+
+def _matches(stored_otp, otp):
+    return hmac.compare_digest(stored_otp.encode(), str(otp).encode())
+
+def verify_otp(contact, otp):
+    """Verifies an OTP and marks the user as verified if correct.
+
+    Checking and consuming the code happen atomically, so a code is accepted once.
+    """
+    now = int(time.time())
+    if OTP_BACKEND == "memory":
+        with _memory_lock:
+            entry = _memory_otps.get(contact)
+            if entry is None or entry[1] <= now or not _matches(entry[0], otp):
+                return False
+            del _memory_otps[contact]
+        conn = sqlite3.connect(DB_FILE)
+        try:
+            conn.execute("UPDATE users SET is_verified = 1 WHERE contact = ?", (contact,))
+            conn.commit()
+        finally:
+            conn.close()
+        return True
+
+    conn = sqlite3.connect(DB_FILE, isolation_level=None)
+    try:
+        # BEGIN IMMEDIATE takes the write lock before reading, so no other
+        # connection can read and consume the same code in between
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT otp FROM otps WHERE contact = ? AND expires_at > ?",
+                               (contact, now)).fetchone()
+            if row is None or not _matches(row[0], otp):
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute("DELETE FROM otps WHERE contact = ?", (contact,))
+            conn.execute("UPDATE users SET is_verified = 1 WHERE contact = ?", (contact,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+    finally:
+        conn.close()
+
+def sweep_expired(now=None):
+    """Deletes expired OTPs and returns how many were removed."""
+    now = int(time.time()) if now is None else now
+    if OTP_BACKEND == "memory":
+        with _memory_lock:
+            expired = [contact for contact, (_, expires_at) in _memory_otps.items() if expires_at <= now]
+            for contact in expired:
+                del _memory_otps[contact]
+        return len(expired)
+
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        removed = conn.execute("DELETE FROM otps WHERE expires_at <= ?", (now,)).rowcount
+        conn.commit()
+        return removed
+    finally:
+        conn.close()
+
+def start_sweeper(interval=OTP_SWEEP_INTERVAL):
+    """Starts a daemon thread that periodically removes expired OTPs (once per process)."""
+    global _sweeper
+    if _sweeper is not None:
+        return _sweeper
+
+    def _loop():
+        while True:
+            time.sleep(interval)
+            try:
+                sweep_expired()
+            except Exception as e:
+                print(f"Error sweeping expired OTPs: {e}")
+
+    _sweeper = threading.Thread(target=_loop, name="otp-sweeper", daemon=True)
+    _sweeper.start()
+    return _sweeper
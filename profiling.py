@@ -0,0 +1,115 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+# Directory holding one .prof (cProfile stats) and one .json summary per capture
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+MAX_CAPTURES = int(os.environ.get("PROFILE_MAX_CAPTURES", 50))
+TRACEMALLOC_FRAMES = 10
+TOP_ENTRIES = 25
+
+# cProfile and tracemalloc are process-wide, so only one capture runs at a time
+_capture_lock = threading.Lock()
+
+def _capture_id(name):
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "request"
+    now = time.time()
+    return f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}-{safe_name}"
+
+def _top_functions(profiler):
+    """Returns the TOP_ENTRIES functions by cumulative time as dicts."""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{filename}:{line}({func})", "calls": ncalls,
+                     "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)})
+    return sorted(rows, key=lambda row: row["cumtime"], reverse=True)[:TOP_ENTRIES]
+
+def _top_allocations(snapshot):
+    """Returns the TOP_ENTRIES allocation sites still held when the request finished."""
+    return [
+        {"location": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "blocks": stat.count}
+        for stat in snapshot.statistics("lineno")[:TOP_ENTRIES]
+    ]
+
+def _prune():
+    """Deletes the oldest captures beyond MAX_CAPTURES."""
+    summaries = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in summaries[:max(len(summaries) - MAX_CAPTURES, 0)]:
+        for suffix in (".json", ".prof"):
+            path = os.path.join(PROFILE_DIR, name[:-len(".json")] + suffix)
+            if os.path.exists(path):
+                os.unlink(path)
+
+def profile_call(name, func, details=None):
+    """Runs func() under cProfile and tracemalloc and stores the capture.
+
+    Returns (result, capture_id); capture_id is None if another capture was
+    already running, in which case func runs unprofiled.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        return func(), None
+    try:
+        capture_id = _capture_id(name)
+        profiler = cProfile.Profile()
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        start = time.perf_counter()
+        try:
+            result = profiler.runcall(func)
+        finally:
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(PROFILE_DIR, f"{capture_id}.prof"))
+        summary = {
+            "id": capture_id,
+            "name": name,
+            "details": details or {},
+            "captured_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seconds": round(seconds, 4),
+            "peak_memory_kb": round(peak / 1024, 1),
+            "top_functions": _top_functions(profiler),
+            "top_allocations": _top_allocations(snapshot),
+        }
+        with open(os.path.join(PROFILE_DIR, f"{capture_id}.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        _prune()
+        return result, capture_id
+    finally:
+        _capture_lock.release()
+
+def list_captures(limit=20):
+    """Returns summaries (without the per-function tables) of the newest captures."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith(".json")), reverse=True)
+    captures = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                summary = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable profile capture {name}: {e}")
+            continue
+        captures.append({key: summary[key] for key in ("id", "name", "details", "captured_at",
+                                                       "seconds", "peak_memory_kb")})
+    return captures
+
+def get_capture(capture_id):
+    """Returns a capture's full summary, or None if it does not exist."""
+    if not re.fullmatch(r"[A-Za-z0-9_.-]+", capture_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{capture_id}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,104 @@
+import json
+import os
+import sqlite3
+import time
+
+# One SQLite file shared by every worker process on the host; WAL mode lets
+# workers read while another one writes.
+CACHE_FILE = os.environ.get("SHARED_CACHE_FILE", "shared_cache.db")
+CACHE_MAX_BYTES = int(os.environ.get("SHARED_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Bump when a cached payload's format changes so old entries are never read back
+CACHE_FORMAT_VERSION = 1
+# Eviction removes least recently used entries until the cache is this full
+EVICT_TO_FRACTION = 0.9
+# Reads only refresh an entry's access time this often, to keep reads write-free
+TOUCH_INTERVAL = 60
+
+def _connect():
+    return sqlite3.connect(CACHE_FILE, timeout=5)
+
+def init_cache():
+    """Creates the cache table (call once at startup)."""
+    conn = _connect()
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''CREATE TABLE IF NOT EXISTS cache_entries (
+                            key TEXT PRIMARY KEY,
+                            value BLOB NOT NULL,
+                            size INTEGER NOT NULL,
+                            created_at REAL NOT NULL,
+                            accessed_at REAL NOT NULL)''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed_at ON cache_entries (accessed_at)")
+        conn.commit()
+    finally:
+        conn.close()
+
+def make_key(namespace, version, **params):
+    """Builds a versioned cache key.
+
+    version identifies the underlying data; entries for an old version are
+    never hit again and age out through eviction.
+    """
+    encoded = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return f"v{CACHE_FORMAT_VERSION}:{namespace}:{version}:{encoded}"
+
+def get(key):
+    """Returns the cached JSON value for a key, or None on a miss or cache error."""
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT value, accessed_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > TOUCH_INTERVAL:
+                conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+            return json.loads(row[0])
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Shared cache read failed: {e}")
+        return None
+
+def put(key, value):
+    """Stores a JSON-serializable value, evicting old entries past CACHE_MAX_BYTES.
+
+    The write and its evictions commit in one transaction, so other workers see
+    either the old state or the new one. Returns True if the value was stored.
+    """
+    blob = json.dumps(value, separators=(",", ":")).encode()
+    if len(blob) > CACHE_MAX_BYTES * EVICT_TO_FRACTION:
+        return False
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                now = time.time()
+                conn.execute("""INSERT OR REPLACE INTO cache_entries (key, value, size, created_at, accessed_at)
+                                VALUES (?, ?, ?, ?, ?)""", (key, blob, len(blob), now, now))
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+                if total > CACHE_MAX_BYTES:
+                    excess = total - int(CACHE_MAX_BYTES * EVICT_TO_FRACTION)
+                    # Delete oldest-accessed entries until at least excess bytes are freed
+                    conn.execute("""DELETE FROM cache_entries WHERE key IN (
+                                        SELECT key FROM (
+                                            SELECT key, SUM(size) OVER (ORDER BY accessed_at, key) - size AS freed
+                                            FROM cache_entries)
+                                        WHERE freed < ?)""", (excess,))
+            return True
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Shared cache write failed: {e}")
+        return False
+
+def stats():
+    """Returns entry count and total size of the cache."""
+    conn = _connect()
+    try:
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries").fetchone()
+    finally:
+        conn.close()
+    return {"entries": entries, "bytes": size, "max_bytes": CACHE_MAX_BYTES}
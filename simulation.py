@@ -0,0 +1,104 @@
+import time
+
+import numpy as np
+
+DEFAULT_PATHS = 2000
+MAX_PATHS = 20000
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+QUANTILE_LABELS = tuple(f"p{int(q * 100)}" for q in QUANTILES)
+
+# Latency budget for simulating DEFAULT_PATHS paths over a 5-year horizon (see __main__)
+SIMULATION_BUDGET_MS = 50
+# Simulated 90% interval bounds must match the analytic ones to this fraction of the interval width
+INTERVAL_TOLERANCE = 0.05
+
+def _matrix_sqrt(cov):
+    """Returns S with S @ S.T == cov, tolerating singular (e.g. diffuse or zero) covariances."""
+    eigvals, eigvecs = np.linalg.eigh(cov)
+    return eigvecs * np.sqrt(np.clip(eigvals, 0, None))
+
+def check_simulation(model):
+    """Raises ValueError if the model's forecast uncertainty would be meaningless.
+
+    SARIMAX starts from a diffuse prior (variance 1e6) that the first
+    loglikelihood_burn observations only begin to shrink. A model with no
+    observations past them, e.g. the seasonal category orders on ~12 yearly
+    points, ends the sample with that prior still in its state covariance, so
+    both simulated and analytic bands span thousands.
+    """
+    if model.nobs <= model.loglikelihood_burn:
+        raise ValueError(f"uncertainty=mc needs more than {model.loglikelihood_burn} observations for "
+                         f"SARIMAX{tuple(model.order)}x{tuple(model.seasonal_order)}, got {model.nobs}")
+
+def simulate_paths(fitted, steps, n_paths=DEFAULT_PATHS, seed=None):
+    """Simulates future observation paths from a fitted state-space (SARIMAX) model.
+
+    Starts from the filtered state at the end of the sample and advances all
+    paths together, so each step is one (n_paths x k_states) matrix product and
+    all random draws happen up front. Returns an (n_paths, steps) array.
+    """
+    res = fitted.filter_results
+    design = res.design[:, :, -1]
+    obs_intercept = res.obs_intercept[:, -1]
+    transition = res.transition[:, :, -1]
+    state_intercept = res.state_intercept[:, -1]
+    obs_sqrt = _matrix_sqrt(res.obs_cov[:, :, -1])
+    state_sqrt = res.selection[:, :, -1] @ _matrix_sqrt(res.state_cov[:, :, -1])
+    k_endog, k_states = design.shape
+
+    rng = np.random.default_rng(seed)
+    states = res.predicted_state[:, -1] + rng.standard_normal((n_paths, k_states)) @ _matrix_sqrt(
+        res.predicted_state_cov[:, :, -1]).T
+    obs_noise = rng.standard_normal((steps, n_paths, k_endog)) @ obs_sqrt.T
+    state_noise = rng.standard_normal((steps, n_paths, state_sqrt.shape[1])) @ state_sqrt.T
+
+    paths = np.empty((n_paths, steps))
+    for step in range(steps):
+        paths[:, step] = (states @ design.T + obs_intercept + obs_noise[step])[:, 0]
+        states = states @ transition.T + state_intercept + state_noise[step]
+    return paths
+
+def band_offsets(paths, mean):
+    """Returns quantile offsets from the model mean, shape (len(QUANTILES), steps)."""
+    return np.quantile(paths, QUANTILES, axis=0) - np.asarray(mean, dtype=float)
+
+if __name__ == "__main__":
+    # Benchmark: fit one commodity and check simulation latency against the budget and the
+    # simulated intervals against the analytic ones; exits non-zero on failure so it can gate CI
+    import sys
+
+    import pandas as pd
+    from forecasting import build_model
+
+    # The monthly series is long enough to get past the category model's burn-in
+    df = pd.read_csv("datamain.csv").set_index("Commodities").T
+    series = pd.Series(df["Rice"].values, index=pd.date_range("2014-01", periods=len(df), freq="M")).ffill()
+    model = build_model(series, "cereals")
+    check_simulation(model)
+    fitted = model.fit(disp=False)
+    forecast = fitted.get_forecast(steps=5)
+
+    simulate_paths(fitted, 5, seed=0)  # warm-up
+    timings = []
+    for _ in range(20):
+        start = time.perf_counter()
+        paths = simulate_paths(fitted, 5)
+        timings.append((time.perf_counter() - start) * 1000)
+    p95 = float(np.percentile(timings, 95))
+
+    analytic = forecast.conf_int(alpha=0.1).to_numpy()
+    simulated = np.quantile(simulate_paths(fitted, 5, n_paths=MAX_PATHS, seed=0), [0.05, 0.95], axis=0).T
+    print(f"{DEFAULT_PATHS} paths x 5 steps: median {np.median(timings):.2f}ms, p95 {p95:.2f}ms "
+          f"(budget {SIMULATION_BUDGET_MS}ms)")
+    print(f"90% interval, analytic vs simulated:\n{np.round(np.hstack([analytic, simulated]), 2)}")
+    failed = False
+    if p95 > SIMULATION_BUDGET_MS:
+        print("❌ Over budget")
+        failed = True
+    mismatch = np.abs(simulated - analytic).max(axis=1) / (analytic[:, 1] - analytic[:, 0])
+    if mismatch.max() > INTERVAL_TOLERANCE:
+        print(f"❌ Simulated intervals differ from analytic by up to {mismatch.max():.1%} of their width")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print(f"✅ Within budget, intervals agree to {mismatch.max():.1%} of their width")
@@ -2,6 +2,8 @@ const API_BASE_URL = "http://127.0.0.1:5000";
 let priceChart = null;
 let historicalData = [];
 let predictedData = [];
+// Server-side downsampling target for chart series
+const CHART_MAX_POINTS = 500;
 
 // Price Alert System
 let activeAlerts = [];
@@ -131,7 +133,7 @@ async function fetchPrices() {
             return;
         }
         
-        const response = await fetch(`${API_BASE_URL}/get_prices?commodity=${encodeURIComponent(commodity)}`, {
+        const response = await fetch(`${API_BASE_URL}/get_prices?commodity=${encodeURIComponent(commodity)}&rollup=monthly&max_points=${CHART_MAX_POINTS}`, {
             credentials: 'include'
         });
         
@@ -203,7 +205,7 @@ async function getPredictions() {
             return;
         }
         
-        const response = await fetch(`${API_BASE_URL}/predict_prices?commodity=${encodeURIComponent(commodity)}`, {
+        const response = await fetch(`${API_BASE_URL}/predict_prices?commodity=${encodeURIComponent(commodity)}&max_points=${CHART_MAX_POINTS}`, {
             credentials: 'include'
         });
         
@@ -861,7 +863,7 @@ function checkPredictionAccess() {
 
 // API calls with credentials
 function fetchHistoricalPrices(commodity) {
-    return fetch(`${API_BASE_URL}/get_prices?commodity=${encodeURIComponent(commodity)}`, {
+    return fetch(`${API_BASE_URL}/get_prices?commodity=${encodeURIComponent(commodity)}&rollup=monthly&max_points=${CHART_MAX_POINTS}`, {
         credentials: 'include'
     })
     .then(response => {
@@ -877,7 +879,7 @@ function fetchHistoricalPrices(commodity) {
 }
 
 function fetchPredictions(commodity) {
-    return fetch(`${API_BASE_URL}/predict_prices?commodity=${encodeURIComponent(commodity)}`, {
+    return fetch(`${API_BASE_URL}/predict_prices?commodity=${encodeURIComponent(commodity)}&max_points=${CHART_MAX_POINTS}`, {
         credentials: 'include'
     })
     .then(response => {